@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import (authentication, ingredient_index,  # noqa: F401
+                       metrics, recipe_matcher, renditions, response_cache)
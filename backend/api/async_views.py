@@ -0,0 +1,167 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from .authentication import AsyncTokenAuthentication
+from .ingredient_index import ingredient_index
+from .metrics import get_serializer_data
+from .response_cache import response_cache
+from .views import RecipeViewSet
+
+
+class AsyncReadView(View):
+    viewset_class = None
+    action = None
+    fallback = None
+    authentication = AsyncTokenAuthentication()
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.fallback is not None and \
+                request.method not in ('GET', 'HEAD'):
+            return sync_to_async(self.fallback)(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            request = await self.initialize_request(request)
+            response = await self.read(request, *args, **kwargs)
+        except Http404 as exc:
+            response = self.handle_exception(
+                request, exceptions.NotFound(*exc.args)
+            )
+        except exceptions.APIException as exc:
+            response = self.handle_exception(request, exc)
+        return self.finalize_response(response)
+
+    async def initialize_request(self, request):
+        user, auth = await self.authentication.aauthenticate(request) or (
+            AnonymousUser(), None
+        )
+        request = Request(request)
+        request.user, request.auth = user, auth
+        return request
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc.detail, (list, dict)):
+            response = Response(exc.detail, status=exc.status_code)
+        else:
+            response = Response({'detail': exc.detail},
+                                status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = \
+                self.authentication.authenticate_header(request)
+        return response
+
+    def finalize_response(self, response):
+        if isinstance(response, Response):
+            response.accepted_renderer = self.renderer
+            response.accepted_media_type = self.renderer.media_type
+            response.renderer_context = {}
+            response.render()
+        return response
+
+    def get_viewset(self, request, **kwargs):
+        viewset = self.viewset_class(
+            request=request, args=(), kwargs=kwargs,
+            action=self.action, format_kwarg=None,
+        )
+        viewset.check_permissions(request)
+        return viewset
+
+    async def get_object(self, viewset, pk):
+        instance = await aget_object_or_404(
+            viewset.filter_queryset(viewset.get_queryset()), pk=pk
+        )
+        viewset.check_object_permissions(viewset.request, instance)
+        return instance
+
+
+class IngredientListView(AsyncReadView):
+
+    async def read(self, request):
+        return HttpResponse(
+            await ingredient_index.arender(
+                request.query_params.get('name', '')
+            ),
+            content_type='application/json',
+        )
+
+
+class RecipeListView(AsyncReadView):
+    viewset_class = RecipeViewSet
+    action = 'list'
+
+    async def read(self, request):
+        return await response_cache.aserve(
+            request, ['recipes'], partial(self.conditional_list, request)
+        )
+
+    async def conditional_list(self, request):
+        viewset = self.get_viewset(request)
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        page = await viewset.paginator.apaginate_queryset(
+            queryset, request, viewset
+        )
+        if page is None:
+            objects = [recipe async for recipe in queryset]
+        else:
+            objects = page
+            await sync_to_async(viewset.set_search_highlights)(page)
+        viewset.membership = await viewset.get_membership(objects).aload()
+        return viewset.conditional_list_response(request, page, objects)
+
+
+class RecipeDetailView(AsyncReadView):
+    viewset_class = RecipeViewSet
+    action = 'retrieve'
+
+    async def read(self, request, pk):
+        viewset = self.get_viewset(request, pk=pk)
+        instance = await aget_object_or_404(
+            viewset.get_validator_queryset(), pk=pk
+        )
+        viewset.membership = await viewset.get_membership(
+            [instance]
+        ).aload()
+        etag, last_modified = viewset.get_retrieve_validators(
+            request, instance
+        )
+        response = viewset.get_not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = await response_cache.aserve(
+            request, [f'recipe:{pk}', 'ingredients'],
+            partial(self.retrieve, viewset, pk),
+        )
+        return viewset.set_validators(response, etag, last_modified)
+
+    async def retrieve(self, viewset, pk):
+        instance = await self.get_object(viewset, pk)
+        return Response(
+            get_serializer_data(viewset.get_serializer(instance))
+        )
+
+
+class RecipeLinkView(AsyncReadView):
+    viewset_class = RecipeViewSet
+    action = 'get_link'
+
+    async def read(self, request, pk):
+        recipe = await self.get_object(self.get_viewset(request, pk=pk), pk)
+        return Response(
+            {'short-link': f'{request.get_host()}/s/{recipe.id}'}
+        )
@@ -0,0 +1,138 @@
+import hashlib
+from functools import partial
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class TokenCache:
+    alias = 'auth_tokens'
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_key(self, key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_user_key(self, user_id):
+        return f'user:{user_id}'
+
+    def get_entries(self, token):
+        return {
+            self.get_key(token.key): token.user,
+            self.get_user_key(token.user_id): token.key,
+        }
+
+    def get(self, key):
+        return self.cache.get(self.get_key(key))
+
+    async def aget(self, key):
+        return await self.cache.aget(self.get_key(key))
+
+    def set(self, token):
+        self.cache.set_many(self.get_entries(token))
+
+    async def aset(self, token):
+        await self.cache.aset_many(self.get_entries(token))
+
+    def invalidate(self, *keys):
+        self.cache.delete_many([self.get_key(key) for key in keys])
+
+    def invalidate_on_commit(self, *keys):
+        transaction.on_commit(partial(self.invalidate, *keys))
+
+    def invalidate_user(self, user_id):
+        user_key = self.get_user_key(user_id)
+        key = self.cache.get(user_key)
+        self.cache.delete_many(
+            [user_key] + ([self.get_key(key)] if key is not None else [])
+        )
+
+    def invalidate_user_on_commit(self, user_id):
+        transaction.on_commit(partial(self.invalidate_user, user_id))
+
+
+token_cache = TokenCache()
+
+
+def get_token(model, key, user):
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return user, model(key=key, user=user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(token)
+            return user, token
+        return get_token(self.get_model(), key, user)
+
+
+class AsyncTokenAuthentication(CachedTokenAuthentication):
+
+    def get_key(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. No credentials provided.')
+            )
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain spaces.')
+            )
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain invalid characters.')
+            )
+
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        model = self.get_model()
+        user = await token_cache.aget(key)
+        if user is not None:
+            return get_token(model, key, user)
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        await token_cache.aset(token)
+        return token.user, token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.invalidate_on_commit(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        token_cache.invalidate_user_on_commit(instance.pk)
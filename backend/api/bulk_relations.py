@@ -0,0 +1,80 @@
+from django.db import IntegrityError, connection, transaction
+from recipes.signals import relations_added, relations_removed
+
+
+def create_relations(model, relations):
+    try:
+        with transaction.atomic():
+            return model.objects.bulk_create(relations)
+    except IntegrityError:
+        created = []
+        for relation in relations:
+            relation.pk = None
+            try:
+                with transaction.atomic():
+                    created += model.objects.bulk_create([relation])
+            except IntegrityError:
+                continue
+        return created
+
+
+def delete_relations(model, relations):
+    if not relations:
+        return []
+    quote = connection.ops.quote_name
+    table, pk = quote(model._meta.db_table), quote(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {pk} IN '
+            f'({", ".join(["%s"] * len(relations))}) RETURNING {pk}',
+            [relation.pk for relation in relations],
+        )
+        deleted = {pk for pk, in cursor.fetchall()}
+    return [relation for relation in relations if relation.pk in deleted]
+
+
+def apply_bulk_relation(model, target_field, user, targets, add, remove,
+                        forbidden=()):
+    requested = set(add) | set(remove)
+    found = set(
+        targets.filter(id__in=requested).values_list('id', flat=True)
+    )
+    current = {
+        getattr(relation, target_field): relation
+        for relation in model.objects.filter(
+            user=user, **{f'{target_field}__in': requested}
+        )
+    }
+    created = create_relations(model, [
+        model(user=user, **{target_field: target_id})
+        for target_id in add
+        if target_id in found and target_id not in forbidden
+        and target_id not in current
+    ])
+    deleted = delete_relations(model, [
+        current[target_id] for target_id in remove if target_id in current
+    ])
+    relations_added(model, created)
+    relations_removed(model, deleted)
+    added = {getattr(relation, target_field) for relation in created}
+    removed = {getattr(relation, target_field) for relation in deleted}
+    results = {'add': [], 'remove': []}
+    for target_id in add:
+        if target_id not in found:
+            outcome = 'not_found'
+        elif target_id in forbidden:
+            outcome = 'forbidden'
+        elif target_id in added:
+            outcome = 'added'
+        else:
+            outcome = 'exists'
+        results['add'].append({'id': target_id, 'status': outcome})
+    for target_id in remove:
+        if target_id not in found:
+            outcome = 'not_found'
+        elif target_id in removed:
+            outcome = 'removed'
+        else:
+            outcome = 'absent'
+        results['remove'].append({'id': target_id, 'status': outcome})
+    return results
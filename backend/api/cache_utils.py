@@ -0,0 +1,17 @@
+from django.core.cache import cache
+
+
+def incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key, delta)
+
+
+async def aincr(key, delta=1):
+    try:
+        return await cache.aincr(key, delta)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        return await cache.aincr(key, delta)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from .metrics import get_serializer_data
+
+
+def make_etag(parts, weak=False):
+    digest = hashlib.md5(
+        json.dumps(parts, default=str).encode()
+    ).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    membership = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.membership is not None:
+            context['membership'] = self.membership
+        return context
+
+    def get_validator_queryset(self):
+        return self.get_queryset()
+
+    def get_not_modified(self, request, etag, last_modified=None):
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            response['ETag'] = etag
+        return response
+
+    def get_last_modified(self, instance):
+        return int(max(self.get_timestamps(instance)).timestamp())
+
+    def get_retrieve_validators(self, request, instance):
+        etag = make_etag([
+            instance.pk,
+            self.get_timestamps(instance),
+            self.membership.snapshot(),
+        ])
+        last_modified = None
+        if not request.user.is_authenticated:
+            last_modified = self.get_last_modified(instance)
+        return etag, last_modified
+
+    def set_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def conditional_retrieve(self, request, view, pk):
+        instance = get_object_or_404(self.get_validator_queryset(), pk=pk)
+        self.membership = self.get_membership([instance])
+        etag, last_modified = self.get_retrieve_validators(request, instance)
+        response = self.get_not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return self.set_validators(view(), etag, last_modified)
+
+    def conditional_list(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        self.membership = self.get_membership(objects)
+        return self.conditional_list_response(request, page, objects)
+
+    def conditional_list_response(self, request, page, objects):
+        etag = make_etag([
+            request.get_full_path(),
+            self.paginator.get_count() if page is not None else None,
+            [(obj.pk, self.get_timestamps(obj)) for obj in objects],
+            self.membership.snapshot(),
+        ], weak=True)
+        response = self.get_not_modified(request, etag)
+        if response is not None:
+            return response
+        data = get_serializer_data(self.get_serializer(objects, many=True))
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,41 @@
+from django.db.models import Q
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+
+class RecipeFeed:
+
+    def __init__(self, user, queryset):
+        self.user = user
+        self.queryset = queryset
+
+    def window(self, position, size):
+        entries = FeedEntry.objects.filter(user=self.user)
+        pulled = Recipe.objects.filter(
+            fanned_out=False,
+            author__in=Follow.objects.filter(user=self.user).values(
+                'follower'
+            ),
+        )
+        if position is not None:
+            published, recipe_id = position
+            entries = entries.filter(
+                Q(pub_date__lt=published)
+                | Q(pub_date=published, recipe_id__lt=recipe_id)
+            )
+            pulled = pulled.filter(
+                Q(pub_date__lt=published)
+                | Q(pub_date=published, id__lt=recipe_id)
+            )
+        keys = set(entries.order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[:size])
+        keys.update(pulled.order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id'
+        )[:size])
+        recipe_ids = [
+            recipe_id for _, recipe_id in sorted(keys, reverse=True)[:size]
+        ]
+        recipes = self.queryset.in_bulk(recipe_ids)
+        return [recipes[recipe_id] for recipe_id in recipe_ids
+                if recipe_id in recipes]
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import logging
+import re
+import time
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+from .cache_utils import incr
+
+logger = logging.getLogger(__name__)
+
+DATA_URL = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?;base64,')
+CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class ImageUploadMetrics:
+    prefix = 'image_uploads'
+    names = ('accepted', 'rejected', 'bytes', 'decode_ms')
+
+    def add(self, name, value=1):
+        key = f'{self.prefix}:{name}'
+        incr(key, value)
+
+    def record(self, accepted, size=0, seconds=0):
+        self.add('accepted' if accepted else 'rejected')
+        if accepted:
+            self.add('bytes', size)
+            self.add('decode_ms', round(seconds * 1000))
+
+    def stats(self):
+        values = cache.get_many(
+            [f'{self.prefix}:{name}' for name in self.names]
+        )
+        return {
+            name: values.get(f'{self.prefix}:{name}', 0)
+            for name in self.names
+        }
+
+
+image_upload_metrics = ImageUploadMetrics()
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректная строка base64.',
+        'invalid_image': 'Загрузите корректное изображение.',
+        'invalid_format': 'Формат изображения не поддерживается.',
+        'too_large': 'Размер файла не должен превышать {limit} байт.',
+        'too_many_pixels': (
+            'Изображение должно быть не больше {side} пикселей по стороне '
+            'и {pixels} пикселей в сумме.'
+        ),
+    }
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 8 * 1024 * 1024)
+
+    @property
+    def max_side(self):
+        return getattr(settings, 'IMAGE_UPLOAD_MAX_SIDE', 8000)
+
+    @property
+    def max_pixels(self):
+        return getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)
+
+    @property
+    def formats(self):
+        return getattr(settings, 'IMAGE_UPLOAD_FORMATS',
+                       ('JPEG', 'PNG', 'GIF', 'WEBP'))
+
+    def to_internal_value(self, data):
+        if data in ('', None):
+            return None
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        started = time.perf_counter()
+        try:
+            upload = self.decode(data)
+        except serializers.ValidationError:
+            image_upload_metrics.record(False)
+            raise
+        elapsed = time.perf_counter() - started
+        image_upload_metrics.record(True, upload.size, elapsed)
+        logger.debug('Изображение %s: %s байт за %.1f мс',
+                     upload.name, upload.size, elapsed * 1000)
+        return upload
+
+    def decode(self, data):
+        match = DATA_URL.match(data)
+        start = match.end() if match else 0
+        if (len(data) - start) * 3 // 4 > self.max_bytes + 2:
+            self.fail('too_large', limit=self.max_bytes)
+        spooled = SpooledTemporaryFile(
+            max_size=getattr(settings, 'FILE_UPLOAD_MAX_MEMORY_SIZE',
+                             2621440)
+        )
+        try:
+            size = self.write_chunks(data, start, spooled)
+            spooled.seek(0)
+            file_format = self.check_image(spooled)
+        except Exception:
+            spooled.close()
+            raise
+        spooled.seek(0)
+        extension = EXTENSIONS.get(file_format, file_format.lower())
+        return UploadedFile(
+            spooled, name=f'{uuid4()}.{extension}',
+            content_type=Image.MIME.get(file_format), size=size,
+        )
+
+    def write_chunks(self, data, start, target):
+        size, tail = 0, ''
+        for offset in range(start, len(data), CHUNK_SIZE):
+            chunk = tail + ''.join(data[offset:offset + CHUNK_SIZE].split())
+            usable = len(chunk) - len(chunk) % 4
+            chunk, tail = chunk[:usable], chunk[usable:]
+            try:
+                decoded = base64.b64decode(chunk, validate=True)
+            except (binascii.Error, ValueError):
+                self.fail('invalid_base64')
+            size += len(decoded)
+            if size > self.max_bytes:
+                self.fail('too_large', limit=self.max_bytes)
+            target.write(decoded)
+        if tail or not size:
+            self.fail('invalid_base64')
+        return size
+
+    def check_image(self, source):
+        try:
+            with Image.open(source) as image:
+                file_format = image.format
+                width, height = image.size
+                if file_format not in self.formats:
+                    self.fail('invalid_format')
+                if (
+                    max(width, height) > self.max_side
+                    or width * height > self.max_pixels
+                ):
+                    self.fail('too_many_pixels', side=self.max_side,
+                              pixels=self.max_pixels)
+                image.verify()
+        except serializers.ValidationError:
+            raise
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', side=self.max_side,
+                      pixels=self.max_pixels)
+        except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+            self.fail('invalid_image')
+        return file_format
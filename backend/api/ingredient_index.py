@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+from recipes.models import Ingredient
+from .cache_utils import incr
+
+
+class IngredientIndex:
+    version_key = 'ingredient_index_version'
+    max_responses = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = (None, [], [])
+        self._responses = OrderedDict()
+
+    @property
+    def limit(self):
+        return getattr(settings, 'INGREDIENT_SEARCH_LIMIT', None)
+
+    def current_version(self):
+        return cache.get_or_set(self.version_key, 0, timeout=None)
+
+    async def acurrent_version(self):
+        return await cache.aget_or_set(self.version_key, 0, timeout=None)
+
+    def invalidate(self):
+        incr(self.version_key)
+        with self._lock:
+            self._state = (None, [], [])
+            self._responses.clear()
+
+    def _rows(self):
+        return Ingredient.objects.values('id', 'name', 'measurement_unit')
+
+    def _store(self, version, rows):
+        with self._lock:
+            if self._state[0] != version:
+                rows = sorted(
+                    rows, key=lambda row: (row['name'].casefold(), row['id'])
+                )
+                keys = [row['name'].casefold() for row in rows]
+                self._state = (version, keys, rows)
+                self._responses.clear()
+            return self._state
+
+    def _load(self):
+        version = self.current_version()
+        if self._state[0] == version:
+            return self._state
+        return self._store(version, list(self._rows()))
+
+    async def _aload(self):
+        version = await self.acurrent_version()
+        if self._state[0] == version:
+            return self._state
+        return self._store(version, [row async for row in self._rows()])
+
+    def _search(self, state, prefix):
+        _, keys, rows = state
+        prefix = prefix.casefold()
+        limit = self.limit
+        result = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(rows[position])
+        return result
+
+    def search(self, prefix=''):
+        return self._search(self._load(), prefix)
+
+    def _render(self, state, prefix):
+        key = (state[0], prefix.casefold(), self.limit)
+        with self._lock:
+            content = self._responses.get(key)
+            if content is not None:
+                self._responses.move_to_end(key)
+                return content
+        content = JSONRenderer().render(self._search(state, prefix))
+        with self._lock:
+            if state[0] == self._state[0]:
+                self._responses[key] = content
+                if len(self._responses) > self.max_responses:
+                    self._responses.popitem(last=False)
+        return content
+
+    def render(self, prefix=''):
+        return self._render(self._load(), prefix)
+
+    async def arender(self, prefix=''):
+        return self._render(await self._aload(), prefix)
+
+
+ingredient_index = IngredientIndex()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
@@ -0,0 +1,107 @@
+import base64
+import io
+import statistics
+import tempfile
+import time
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.views import RecipeViewSet
+from recipes.models import Ingredient
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время создания рецепта через API в зависимости '
+            'от количества ингредиентов. Все изменения откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 10, 40, 100],
+            help='Количество ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько рецептов создавать для каждого размера.',
+        )
+
+    def get_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, format='PNG')
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+
+    def get_ingredient_ids(self, count):
+        ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+            [:count]
+        )
+        missing = count - len(ids)
+        if missing > 0:
+            created = Ingredient.objects.bulk_create([
+                Ingredient(name=f'benchmark {number}', measurement_unit='г')
+                for number in range(missing)
+            ])
+            ids.extend(ingredient.id for ingredient in created)
+        return ids
+
+    def measure(self, user, image, ingredient_ids, repeat):
+        view = RecipeViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+        payload = {
+            'name': 'benchmark', 'text': 'benchmark', 'cooking_time': 1,
+            'image': image,
+            'ingredients': [{'id': ingredient_id, 'amount': 1}
+                            for ingredient_id in ingredient_ids],
+        }
+        timings, queries = [], []
+        for _ in range(repeat):
+            request = factory.post('/api/recipes/', payload, format='json')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = view(request)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                raise RuntimeError(response.data)
+            queries.append(len(context.captured_queries))
+        return timings, queries
+
+    def handle(self, *args, **options):
+        rows = []
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root,
+                                      ALLOWED_HOSTS=['testserver']), \
+                    transaction.atomic():
+                user = User.objects.create_user(
+                    username='benchmark', email='benchmark@example.com',
+                    first_name='benchmark', last_name='benchmark',
+                    password='benchmark',
+                )
+                image = self.get_image()
+                ingredient_ids = self.get_ingredient_ids(
+                    max(options['sizes'])
+                )
+                for size in options['sizes']:
+                    timings, queries = self.measure(
+                        user, image, ingredient_ids[:size], options['repeat']
+                    )
+                    rows.append((size, statistics.median(timings),
+                                 max(timings), statistics.median(queries)))
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f'{"ingredients":>11} {"median, ms":>10} '
+                          f'{"max, ms":>8} {"queries":>7}')
+        for size, median, slowest, queries in rows:
+            self.stdout.write(f'{size:>11} {median * 1000:>10.1f} '
+                              f'{slowest * 1000:>8.1f} {queries:>7g}')
@@ -0,0 +1,101 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.csv'
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON файла.'
+    read_size = 64 * 1024
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Путь к файлу ingredients.csv или ingredients.json.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одном INSERT.',
+        )
+
+    def read_csv(self, file):
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+    def read_json(self, file):
+        decoder = json.JSONDecoder()
+        buffer = ''
+        started = False
+        while True:
+            chunk = file.read(self.read_size)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and \
+                        buffer[position] in ' \t\r\n,':
+                    position += 1
+                if not started and position < len(buffer):
+                    if buffer[position] != '[':
+                        raise CommandError('Ожидался JSON-массив.')
+                    started = True
+                    position += 1
+                    continue
+                if position < len(buffer) and buffer[position] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise CommandError('Некорректный JSON.')
+                    break
+                position = end
+                yield item['name'], item['measurement_unit']
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+    def read_rows(self, path):
+        reader = self.read_json if path.suffix == '.json' else self.read_csv
+        with open(path, encoding='utf-8', newline='') as file:
+            for name, measurement_unit in reader(file):
+                name, measurement_unit = name.strip(), measurement_unit.strip()
+                if name and measurement_unit:
+                    yield name, measurement_unit
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        batch_size = options['batch_size']
+        rows = self.read_rows(path)
+        total = 0
+        started = time.perf_counter()
+        with transaction.atomic():
+            before = Ingredient.objects.count()
+            while True:
+                batch = dict.fromkeys(islice(rows, batch_size))
+                if not batch:
+                    break
+                total += len(batch)
+                Ingredient.objects.bulk_create(
+                    [Ingredient(name=name, measurement_unit=unit)
+                     for name, unit in batch],
+                    ignore_conflicts=True,
+                )
+            created = Ingredient.objects.count() - before
+            transaction.on_commit(ingredient_index.invalidate)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {total}, добавлено: {created}, '
+            f'{elapsed:.2f} с, {total / max(elapsed, 1e-9):.0f} строк/с.'
+        ))
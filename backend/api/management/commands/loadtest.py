@@ -0,0 +1,177 @@
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from api.metrics import percentile
+
+
+class Stats:
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.received = 0
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест HTTP API: держит заданное число keep-alive '
+            'соединений и измеряет пропускную способность и задержки. '
+            'Несколько целей (например, sync и async развёртывания) '
+            'проверяются по очереди и сводятся в одну таблицу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Адреса серверов в виде URL или имя=URL, '
+                 'например sync=http://localhost:8000.',
+        )
+        parser.add_argument(
+            '--paths', nargs='+',
+            default=['/api/recipes/', '/api/recipes/?limit=20',
+                     '/api/ingredients/?name=%D1%81'],
+            help='Запрашиваемые пути, перебираются по кругу.',
+        )
+        parser.add_argument(
+            '--connections', type=int, default=1000,
+            help='Количество одновременных соединений.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность теста для каждой цели, секунды.',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=30,
+            help='Таймаут одного запроса, секунды.',
+        )
+        parser.add_argument(
+            '--read-rate', type=int, default=0,
+            help='Скорость чтения ответа одним клиентом, байт/с '
+                 '(эмуляция медленных клиентов, 0 - без ограничений).',
+        )
+        parser.add_argument('--token', help='Токен авторизации.')
+
+    def parse_target(self, target):
+        name, _, url = target.rpartition('=')
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'Поддерживаются только http:// адреса: {url}')
+        return name or url, parts.hostname, parts.port or 80
+
+    async def read_body(self, reader, length, read_rate):
+        if not read_rate:
+            return len(await reader.readexactly(length))
+        received = 0
+        while received < length:
+            chunk = await reader.readexactly(
+                min(length - received, max(read_rate // 10, 1))
+            )
+            received += len(chunk)
+            await asyncio.sleep(len(chunk) / read_rate)
+        return received
+
+    async def fetch(self, reader, writer, request, read_rate):
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise EOFError('соединение закрыто сервером')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+        if headers.get('transfer-encoding') == 'chunked':
+            received = 0
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                received += await self.read_body(reader, size + 2, read_rate)
+                if not size:
+                    break
+        else:
+            received = await self.read_body(
+                reader, int(headers.get('content-length', 0)), read_rate
+            )
+        return status, received, headers.get('connection') != 'close'
+
+    async def client(self, host, port, requests, offset, deadline, stats,
+                     options):
+        loop = asyncio.get_running_loop()
+        writer = None
+        number = offset
+        while loop.time() < deadline:
+            request = requests[number % len(requests)]
+            number += 1
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port),
+                        options['timeout'],
+                    )
+                started = loop.time()
+                status, received, keep_alive = await asyncio.wait_for(
+                    self.fetch(reader, writer, request, options['read_rate']),
+                    options['timeout'],
+                )
+                stats.latencies.append(loop.time() - started)
+                stats.statuses[status] += 1
+                stats.received += received
+            except (OSError, EOFError, ValueError,
+                    asyncio.TimeoutError) as error:
+                stats.errors[type(error).__name__] += 1
+                keep_alive = False
+                await asyncio.sleep(0.1)
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def run(self, host, port, options):
+        headers = f'Host: {host}:{port}\r\nAccept: application/json\r\n'
+        if options['token']:
+            headers += f'Authorization: Token {options["token"]}\r\n'
+        requests = [
+            f'GET {path} HTTP/1.1\r\n{headers}\r\n'.encode()
+            for path in options['paths']
+        ]
+        stats = Stats()
+        deadline = asyncio.get_running_loop().time() + options['duration']
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self.client(host, port, requests, offset, deadline, stats,
+                        options)
+            for offset in range(options['connections'])
+        ))
+        return stats, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        targets = [self.parse_target(target) for target in options['targets']]
+        self.stdout.write(
+            f'{"target":>12} {"requests":>9} {"rps":>8} {"errors":>7} '
+            f'{"non-2xx":>8} {"p50, ms":>8} {"p95, ms":>8} {"p99, ms":>8} '
+            f'{"max, ms":>8}'
+        )
+        for name, host, port in targets:
+            stats, elapsed = asyncio.run(self.run(host, port, options))
+            latencies = sorted(stats.latencies)
+            failed = sum(
+                count for status, count in stats.statuses.items()
+                if not 200 <= status < 400
+            )
+            self.stdout.write(
+                f'{name:>12} {len(latencies):>9} '
+                f'{len(latencies) / elapsed:>8.1f} '
+                f'{sum(stats.errors.values()):>7} {failed:>8} '
+                + ' '.join(
+                    f'{percentile(latencies, fraction) * 1000:>8.1f}'
+                    for fraction in (0.5, 0.95, 0.99, 1)
+                )
+            )
+            if stats.errors:
+                self.stderr.write(f'{name}: {dict(stats.errors)}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from api.response_cache import response_cache
+from recipes.models import RecipeRanking
+
+
+class Command(BaseCommand):
+    help = ('Обновляет рейтинги рецептов (ordering=popular и trending) по '
+            'накопленным событиям избранного и корзины. Запускается '
+            'периодически, например из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Количество событий, обрабатываемых за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать рейтинги по всем записям избранного и корзин '
+                 '(после изменения весов или периода полураспада).',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = RecipeRanking.objects.rebuild(options['batch_size'])
+            message = f'Пересчитано рейтингов: {count}.'
+        else:
+            count = RecipeRanking.objects.refresh(options['batch_size'])
+            message = f'Обработано событий: {count}.'
+        if count:
+            response_cache.invalidate('recipes')
+        self.stdout.write(self.style.SUCCESS(message))
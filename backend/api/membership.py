@@ -0,0 +1,111 @@
+from django.db import models
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+class MembershipResolver:
+
+    def __init__(self, user, recipe_ids=(), author_ids=(),
+                 subscribed_ids=None):
+        self.user = user
+        self.recipe_ids = set(recipe_ids)
+        self.author_ids = set(author_ids)
+        if subscribed_ids is not None:
+            self.subscribed_ids = set(subscribed_ids)
+
+    @classmethod
+    def from_context(cls, context):
+        resolver = context.get('membership')
+        if resolver is not None:
+            return resolver
+        request = context.get('request')
+        return cls(request.user if request else None)
+
+    @property
+    def is_active(self):
+        return self.user is not None and self.user.is_authenticated
+
+    def _scoped_ids(self, model, field, ids):
+        if not self.is_active or not ids:
+            return set()
+        return set(
+            model.objects.filter(user=self.user, **{f'{field}__in': ids})
+            .values_list(field, flat=True)
+        )
+
+    async def _ascoped_ids(self, model, field, ids):
+        if not self.is_active or not ids:
+            return set()
+        return {
+            value async for value in
+            model.objects.filter(user=self.user, **{f'{field}__in': ids})
+            .values_list(field, flat=True)
+        }
+
+    async def aload(self):
+        for name, model, field, ids in (
+            ('favorited_ids', Favorite, 'recipe_id', self.recipe_ids),
+            ('in_shopping_cart_ids', ShoppingCart, 'recipe_id',
+             self.recipe_ids),
+            ('subscribed_ids', Follow, 'follower_id', self.author_ids),
+        ):
+            if name not in self.__dict__:
+                self.__dict__[name] = await self._ascoped_ids(
+                    model, field, ids
+                )
+        return self
+
+    @cached_property
+    def favorited_ids(self):
+        return self._scoped_ids(Favorite, 'recipe_id', self.recipe_ids)
+
+    @cached_property
+    def in_shopping_cart_ids(self):
+        return self._scoped_ids(ShoppingCart, 'recipe_id', self.recipe_ids)
+
+    @cached_property
+    def subscribed_ids(self):
+        return self._scoped_ids(Follow, 'follower_id', self.author_ids)
+
+    def snapshot(self):
+        if not self.is_active:
+            return []
+        return [sorted(self.favorited_ids),
+                sorted(self.in_shopping_cart_ids),
+                sorted(self.subscribed_ids)]
+
+    def _check(self, model, field, scope, ids, value):
+        if not self.is_active:
+            return False
+        if value in scope:
+            return value in ids
+        return model.objects.filter(user=self.user, **{field: value}).exists()
+
+    def is_favorited(self, recipe_id):
+        return self._check(Favorite, 'recipe_id', self.recipe_ids,
+                           self.favorited_ids, recipe_id)
+
+    def is_in_shopping_cart(self, recipe_id):
+        return self._check(ShoppingCart, 'recipe_id', self.recipe_ids,
+                           self.in_shopping_cart_ids, recipe_id)
+
+    def is_subscribed(self, author_id):
+        return self._check(Follow, 'follower_id', self.author_ids,
+                           self.subscribed_ids, author_id)
+
+
+class MembershipListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        items = list(data)
+        request = self.context.get('request')
+        if request is not None and 'membership' not in self.context:
+            recipe_ids, author_ids = self.child.get_membership_ids(items)
+            self.context['membership'] = MembershipResolver(
+                request.user, recipe_ids, author_ids
+            )
+        return super().to_representation(items)
@@ -0,0 +1,312 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.response import Response
+from .cache_utils import incr
+from .fields import image_upload_metrics
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNTERS = (
+    ('requests', 'http_requests_total', 1,
+     'Количество обработанных запросов.'),
+    ('queries', 'db_queries_total', 1,
+     'Количество SQL-запросов.'),
+    ('db_us', 'db_duration_seconds_total', 1e-6,
+     'Время выполнения SQL-запросов.'),
+    ('view_us', 'view_duration_seconds_total', 1e-6,
+     'Время работы представления, включая проверку прав, фильтрацию, '
+     'сериализацию и отрисовку ответа, без учёта SQL-запросов.'),
+    ('serialize_us', 'serialize_duration_seconds_total', 1e-6,
+     'Время сериализации ответа без учёта SQL-запросов.'),
+    ('bytes', 'response_bytes_total', 1,
+     'Размер ответов.'),
+    ('alerts', 'query_threshold_exceeded_total', 1,
+     'Количество запросов, превысивших порог числа SQL-запросов.'),
+)
+NAMES = tuple(name for name, _, _, _ in COUNTERS) + ('duration_us',) + tuple(
+    f'bucket:{bound}' for bound in BUCKETS
+)
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class RequestTimings:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.view_seconds = None
+        self.serialize_seconds = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view = getattr(match.func, 'cls', None) or \
+        getattr(match.func, 'view_class', None)
+    if view is None:
+        return match.view_name
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{view.__name__}.{actions.get(method, method)}'
+
+
+class RequestMetrics:
+    prefix = 'request_metrics'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._flushed = time.monotonic()
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'REQUEST_METRICS_FLUSH_INTERVAL', 10)
+
+    def get_threshold(self, view):
+        thresholds = getattr(settings, 'REQUEST_METRICS_QUERY_THRESHOLDS', {})
+        return thresholds.get(view, thresholds.get('*'))
+
+    def key(self, view, name):
+        return f'{self.prefix}:{view}:{name}'
+
+    def views_key(self):
+        return f'{self.prefix}:views'
+
+    def record(self, request, view, timings, duration, size):
+        values = {
+            'requests': 1,
+            'queries': timings.queries,
+            'db_us': round(timings.db_seconds * 1e6),
+            'view_us': round((timings.view_seconds or 0) * 1e6),
+            'serialize_us': round((timings.serialize_seconds or 0) * 1e6),
+            'duration_us': round(duration * 1e6),
+            'bytes': size,
+        }
+        for bound in BUCKETS:
+            if duration <= bound:
+                values[f'bucket:{bound}'] = 1
+                break
+        threshold = self.get_threshold(view)
+        if threshold is not None and timings.queries > threshold:
+            values['alerts'] = 1
+            logger.warning(
+                '%s выполнил %s SQL-запросов при пороге %s: %s %s',
+                view, timings.queries, threshold, request.method,
+                request.get_full_path(),
+            )
+        with self._lock:
+            for name, value in values.items():
+                self._pending[(view, name)] += value
+            pending = self._take(time.monotonic() - self._flushed
+                                 >= self.flush_interval)
+        self.write(pending)
+
+    def _take(self, due=True):
+        if not due:
+            return {}
+        pending, self._pending = self._pending, defaultdict(int)
+        self._flushed = time.monotonic()
+        return pending
+
+    def write(self, pending):
+        if not pending:
+            return
+        views = {view for view, _ in pending}
+        known = cache.get(self.views_key()) or set()
+        if not views <= known:
+            cache.set(self.views_key(), known | views, None)
+        for (view, name), value in pending.items():
+            if value:
+                incr(self.key(view, name), value)
+
+    def flush(self):
+        with self._lock:
+            pending = self._take()
+        self.write(pending)
+
+    def collect(self):
+        self.flush()
+        views = sorted(cache.get(self.views_key()) or ())
+        values = cache.get_many(
+            [self.key(view, name) for view in views for name in NAMES]
+        )
+        return {
+            view: {
+                name: values.get(self.key(view, name), 0) for name in NAMES
+            }
+            for view in views
+        }
+
+    def render(self):
+        collected = self.collect()
+        lines = []
+        for name, metric, scale, description in COUNTERS:
+            lines += [f'# HELP foodgram_{metric} {description}',
+                      f'# TYPE foodgram_{metric} counter']
+            lines += [
+                f'foodgram_{metric}{{view="{view}"}} {values[name] * scale:g}'
+                for view, values in collected.items()
+            ]
+        metric = 'foodgram_http_request_duration_seconds'
+        lines += [f'# HELP {metric} Время обработки запроса.',
+                  f'# TYPE {metric} histogram']
+        for view, values in collected.items():
+            total = 0
+            for bound in BUCKETS:
+                total += values[f'bucket:{bound}']
+                lines.append(
+                    f'{metric}_bucket{{view="{view}",le="{bound}"}} {total}'
+                )
+            lines += [
+                f'{metric}_bucket{{view="{view}",le="+Inf"}} '
+                f'{values["requests"]}',
+                f'{metric}_sum{{view="{view}"}} '
+                f'{values["duration_us"] * 1e-6:g}',
+                f'{metric}_count{{view="{view}"}} {values["requests"]}',
+            ]
+        for prefix, stats in (('response_cache', response_cache.stats()),
+                              ('image_uploads', image_upload_metrics.stats())):
+            for name, value in stats.items():
+                if name.endswith('_ms'):
+                    name, value = name[:-3] + '_seconds', value / 1000
+                metric = f'foodgram_{prefix}_{name}_total'
+                lines += [f'# TYPE {metric} counter', f'{metric} {value:g}']
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        duration = time.perf_counter() - timings.started
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True):
+            parts = [f'db;dur={timings.db_seconds * 1000:.1f};'
+                     f'desc="{timings.queries} queries"']
+            if timings.view_seconds is not None:
+                parts.append(
+                    f'view;dur={timings.view_seconds * 1000:.1f}'
+                )
+            if timings.serialize_seconds is not None:
+                parts.append(
+                    f'serialize;dur={timings.serialize_seconds * 1000:.1f}'
+                )
+            parts.append(f'total;dur={duration * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(parts)
+        request_metrics.record(
+            request, get_view_name(request), timings, duration,
+            0 if response.streaming else len(response.content),
+        )
+        return response
+
+
+def get_serializer_data(serializer):
+    timings = current_timings.get()
+    if timings is None:
+        return serializer.data
+    started, db_seconds = time.perf_counter(), timings.db_seconds
+    data = serializer.data
+    timings.serialize_seconds = (timings.serialize_seconds or 0) + max(
+        time.perf_counter() - started - (timings.db_seconds - db_seconds), 0
+    )
+    return data
+
+
+class RequestMetricsMixin:
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(
+            get_serializer_data(self.get_serializer(self.get_object()))
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return super().dispatch(request, *args, **kwargs)
+        started, db_seconds = time.perf_counter(), timings.db_seconds
+        response = super().dispatch(request, *args, **kwargs)
+        finished = time.perf_counter()
+        timings.view_seconds = max(
+            finished - started - (timings.db_seconds - db_seconds), 0
+        )
+        if hasattr(response, 'add_post_render_callback'):
+            db_seconds = timings.db_seconds
+
+            def add_render_time(response):
+                timings.view_seconds += max(
+                    time.perf_counter() - finished
+                    - (timings.db_seconds - db_seconds), 0
+                )
+
+            response.add_post_render_callback(add_render_time)
+        return response
@@ -1,5 +1,27 @@
 import django_filters
+from django import forms
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Lower
 from recipes.models import Recipe, Favorite, ShoppingCart, Ingredient
+from .paginator import KeysetPaginator
+from .search import search_recipes
+
+
+class RecipeFilterForm(forms.Form):
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('search') and (
+            cleaned_data.get('ordering')
+            or KeysetPaginator.cursor_query_param in self.data
+        ):
+            self.add_error(
+                'search',
+                'Поиск упорядочивается по релевантности и не сочетается '
+                'с параметрами ordering и cursor.'
+            )
+        return cleaned_data
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -17,10 +39,23 @@ class RecipeFilter(django_filters.FilterSet):
         choices=((0, 'False'), (1, 'True')),
         coerce=lambda x: bool(int(x)),
     )
+    search = django_filters.CharFilter(method='filter_search')
+    ordering = django_filters.ChoiceFilter(
+        method='filter_ordering',
+        choices=(('new', 'Новые'), ('popular', 'Популярные'),
+                 ('trending', 'Набирающие популярность')),
+    )
+    orderings = {
+        'new': ('-pub_date', '-id'),
+        'popular': ('-popular_score', '-ranked_id'),
+        'trending': ('-trending_score', '-ranked_id'),
+    }
 
     class Meta:
         model = Recipe
-        fields = ['author', 'is_favorited', 'is_in_shopping_cart']
+        form = RecipeFilterForm
+        fields = ['author', 'is_favorited', 'is_in_shopping_cart', 'search',
+                  'ordering']
 
     def __init__(self, data=None, queryset=None, *, request=None, prefix=None):
         super().__init__(data=data, queryset=queryset, request=request,
@@ -42,13 +77,35 @@ class RecipeFilter(django_filters.FilterSet):
             )
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        if value != 'new':
+            queryset = queryset.filter(ranking__isnull=False).annotate(**{
+                f'{value}_score': F(f'ranking__{value}_score'),
+                'ranked_id': F('ranking__recipe'),
+            })
+        return queryset.order_by(*self.orderings[value])
+
 
 class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith',
+        method='filter_name',
     )
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        prefix = value.lower()
+        queryset = queryset.alias(name_lower=Lower('name')).filter(
+            name_lower__startswith=prefix
+        )
+        if prefix and connections[queryset.db].vendor == 'sqlite':
+            queryset = queryset.filter(
+                name_lower__gte=prefix,
+                name_lower__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1),
+            )
+        return queryset
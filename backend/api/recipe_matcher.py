@@ -0,0 +1,276 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import UsedIngredients
+from .cache_utils import incr
+
+
+def to_bitmap(recipe_ids):
+    if not recipe_ids:
+        return 0
+    buffer = bytearray(recipe_ids[-1] // 8 + 1)
+    for recipe_id in recipe_ids:
+        buffer[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def skip_bits(bitmap, skip):
+    if skip <= 0:
+        return bitmap
+    low, high = 0, bitmap.bit_length()
+    while low < high:
+        middle = (low + high) // 2
+        if (bitmap >> middle).bit_count() <= skip:
+            high = middle
+        else:
+            low = middle + 1
+    return bitmap & ((1 << low) - 1)
+
+
+def take_bits(bitmap, take):
+    positions = []
+    while bitmap and len(positions) < take:
+        position = bitmap.bit_length() - 1
+        positions.append(position)
+        bitmap ^= 1 << position
+    return positions
+
+
+class RecipeMatches:
+
+    def __init__(self, groups):
+        self._groups = groups
+        self._count = sum(bitmap.bit_count() for _, _, bitmap in groups)
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self._count)
+        limit, result = stop - start, []
+        for coverage, matched, bitmap in self._groups:
+            if len(result) >= limit:
+                break
+            size = bitmap.bit_count()
+            if start >= size:
+                start -= size
+                continue
+            result.extend(
+                (coverage, matched, recipe_id)
+                for recipe_id in take_bits(
+                    skip_bits(bitmap, start), limit - len(result)
+                )
+            )
+            start = 0
+        return result
+
+
+class RecipeMatcher:
+    prefix = 'recipe_matcher'
+    change_timeout = 24 * 60 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._bitmaps = {}
+        self._sizes = array('H')
+        self._size_bitmaps = {}
+        self._applied = 0
+        self._missing_since = None
+
+    @property
+    def max_lag(self):
+        return getattr(settings, 'RECIPE_MATCHER_MAX_LAG', 10000)
+
+    def sequence_key(self):
+        return f'{self.prefix}:sequence'
+
+    def change_key(self, number):
+        return f'{self.prefix}:change:{number}'
+
+    def current_sequence(self):
+        return cache.get_or_set(self.sequence_key(), 0, timeout=None)
+
+    def publish(self, recipe_id, added=(), removed=()):
+        number = incr(self.sequence_key())
+        cache.set(self.change_key(number),
+                  (recipe_id, list(added), list(removed)),
+                  self.change_timeout)
+
+    def publish_on_commit(self, recipe_id, added=(), removed=()):
+        transaction.on_commit(
+            partial(self.publish, recipe_id, added, removed)
+        )
+
+    def _rebuild(self):
+        sequence = self.current_sequence()
+        postings, sizes = {}, array('H')
+        rows = UsedIngredients.objects.order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator(chunk_size=10000):
+            recipe_ids = postings.get(ingredient_id)
+            if recipe_ids is None:
+                recipe_ids = postings[ingredient_id] = array('I')
+            recipe_ids.append(recipe_id)
+            self._grow(sizes, recipe_id)
+            sizes[recipe_id] += 1
+        by_size = {}
+        for recipe_id, size in enumerate(sizes):
+            if size:
+                by_size.setdefault(size, array('I')).append(recipe_id)
+        self._postings, self._sizes, self._bitmaps = postings, sizes, {}
+        self._size_bitmaps = {
+            size: to_bitmap(recipe_ids)
+            for size, recipe_ids in by_size.items()
+        }
+        self._applied, self._missing_since = sequence, None
+
+    def _grow(self, sizes, recipe_id):
+        if recipe_id >= len(sizes):
+            sizes.extend(array('H', bytes(
+                2 * max(recipe_id + 1 - len(sizes), len(sizes) // 2)
+            )))
+
+    def _resize(self, recipe_id, delta):
+        self._grow(self._sizes, recipe_id)
+        bit = 1 << recipe_id
+        old = self._sizes[recipe_id]
+        new = self._sizes[recipe_id] = old + delta
+        if old:
+            self._size_bitmaps[old] &= ~bit
+        if new:
+            self._size_bitmaps[new] = self._size_bitmaps.get(new, 0) | bit
+
+    def _add(self, recipe_id, ingredient_id):
+        recipe_ids = self._postings.setdefault(ingredient_id, array('I'))
+        position = bisect_left(recipe_ids, recipe_id)
+        if position < len(recipe_ids) and recipe_ids[position] == recipe_id:
+            return
+        recipe_ids.insert(position, recipe_id)
+        if ingredient_id in self._bitmaps:
+            self._bitmaps[ingredient_id] |= 1 << recipe_id
+        self._resize(recipe_id, 1)
+
+    def _remove(self, recipe_id, ingredient_id):
+        recipe_ids = self._postings.get(ingredient_id)
+        if not recipe_ids:
+            return
+        position = bisect_left(recipe_ids, recipe_id)
+        if position == len(recipe_ids) or recipe_ids[position] != recipe_id:
+            return
+        del recipe_ids[position]
+        if ingredient_id in self._bitmaps:
+            self._bitmaps[ingredient_id] &= ~(1 << recipe_id)
+        self._resize(recipe_id, -1)
+
+    def _catch_up(self):
+        sequence = self.current_sequence()
+        if sequence < self._applied or sequence - self._applied > self.max_lag:
+            self._rebuild()
+            return
+        numbers = range(self._applied + 1, sequence + 1)
+        changes = cache.get_many([self.change_key(n) for n in numbers])
+        for number in numbers:
+            change = changes.get(self.change_key(number))
+            if change is None:
+                if self._missing_since is None:
+                    self._missing_since = time.monotonic()
+                elif time.monotonic() - self._missing_since > 5:
+                    self._rebuild()
+                return
+            recipe_id, added, removed = change
+            for ingredient_id in removed:
+                self._remove(recipe_id, ingredient_id)
+            for ingredient_id in added:
+                self._add(recipe_id, ingredient_id)
+            self._applied, self._missing_since = number, None
+
+    def _load(self):
+        if self._postings is None:
+            self._rebuild()
+        else:
+            self._catch_up()
+
+    def _bitmap(self, ingredient_id):
+        bitmap = self._bitmaps.get(ingredient_id)
+        if bitmap is not None:
+            return bitmap
+        recipe_ids = self._postings.get(ingredient_id, ())
+        bitmap = to_bitmap(recipe_ids)
+        if len(recipe_ids) * 32 >= len(self._sizes):
+            self._bitmaps[ingredient_id] = bitmap
+        return bitmap
+
+    def _count_planes(self, bitmaps):
+        planes = []
+        for carry in bitmaps:
+            for position, plane in enumerate(planes):
+                planes[position], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        return planes
+
+    def match(self, ingredient_ids, exclude_ids=(), min_coverage=0.0):
+        with self._lock:
+            self._load()
+            bitmaps = [self._bitmap(ingredient_id)
+                       for ingredient_id in set(ingredient_ids)]
+            excluded = 0
+            for ingredient_id in set(exclude_ids):
+                excluded |= self._bitmap(ingredient_id)
+            size_bitmaps = dict(self._size_bitmaps)
+        candidates = 0
+        for bitmap in bitmaps:
+            candidates |= bitmap
+        candidates &= ~excluded
+        planes = self._count_planes(bitmaps)
+        groups = []
+        for matched in range(1, len(bitmaps) + 1):
+            exact = candidates
+            for position, plane in enumerate(planes):
+                exact &= plane if matched >> position & 1 else ~plane
+            if not exact:
+                continue
+            for size, size_bitmap in size_bitmaps.items():
+                coverage = matched / size
+                if size < matched or coverage < min_coverage:
+                    continue
+                group = exact & size_bitmap
+                if group:
+                    groups.append((coverage, matched, group))
+        groups.sort(key=lambda group: group[:2], reverse=True)
+        return RecipeMatches(groups)
+
+
+recipe_matcher = RecipeMatcher()
+
+
+@receiver(post_save, sender=UsedIngredients)
+def publish_recipe_ingredient(sender, instance, created, **kwargs):
+    if created:
+        recipe_matcher.publish_on_commit(
+            instance.recipe_id, added=[instance.ingredient_id]
+        )
+
+
+@receiver(post_delete, sender=UsedIngredients)
+def unpublish_recipe_ingredient(sender, instance, **kwargs):
+    recipe_matcher.publish_on_commit(
+        instance.recipe_id, removed=[instance.ingredient_id]
+    )
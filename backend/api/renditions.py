@@ -0,0 +1,160 @@
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+from recipes.models import Recipe
+from users.models import User
+from .authentication import token_cache
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+class RenditionPipeline:
+
+    def __init__(self):
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+                thread_name_prefix='renditions',
+            )
+        return self._executor
+
+    def get_sizes(self, kind):
+        return getattr(settings, 'IMAGE_RENDITIONS', {}).get(kind, {})
+
+    def render(self, field_file, kind):
+        storage = field_file.storage
+        stem = posixpath.splitext(field_file.name)[0]
+        renditions = {'source': field_file.name}
+        with storage.open(field_file.name, 'rb') as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            image = image.convert('RGB')
+        for size_name, size in self.get_sizes(kind).items():
+            rendition = image.copy()
+            rendition.thumbnail(size, Image.Resampling.LANCZOS)
+            renditions[size_name] = {}
+            for extension, (file_format, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                rendition.save(buffer, format=file_format, **options)
+                name = f'renditions/{stem}/{size_name}.{extension}'
+                if storage.exists(name):
+                    storage.delete(name)
+                renditions[size_name][extension] = storage.save(
+                    name, ContentFile(buffer.getvalue())
+                )
+        return renditions
+
+    def process(self, model, pk, field_name, kind):
+        close_old_connections()
+        try:
+            instance = model.objects.filter(pk=pk).first()
+            field_file = getattr(instance, field_name, None)
+            if not field_file:
+                return
+            previous = getattr(instance, f'{field_name}_renditions')
+            renditions = self.render(field_file, kind)
+            updated = model.objects.filter(
+                pk=pk, **{field_name: field_file.name}
+            ).update(**{
+                f'{field_name}_renditions': renditions,
+                'updated_at': timezone.now(),
+            })
+            if updated:
+                self.delete_files(field_file.storage, previous, renditions)
+                self.invalidate(model, pk)
+        except Exception:
+            logger.exception('Не удалось создать превью для %s %s',
+                             model.__name__, pk)
+        finally:
+            close_old_connections()
+
+    def get_names(self, renditions):
+        return {
+            name
+            for size_name, files in renditions.items()
+            if size_name != 'source'
+            for name in files.values()
+        }
+
+    def delete_files(self, storage, previous, current):
+        for name in self.get_names(previous) - self.get_names(current):
+            storage.delete(name)
+
+    def invalidate(self, model, pk):
+        if model is Recipe:
+            response_cache.invalidate('recipes', f'recipe:{pk}')
+            return
+        token_cache.invalidate_user(pk)
+        recipe_ids = Recipe.objects.filter(
+            author_id=pk
+        ).values_list('id', flat=True)
+        response_cache.invalidate(
+            'recipes', *(f'recipe:{recipe_id}' for recipe_id in recipe_ids)
+        )
+
+    def schedule(self, instance, field_name, kind):
+        field_file = getattr(instance, field_name)
+        renditions = getattr(instance, f'{field_name}_renditions')
+        if not field_file:
+            if renditions:
+                type(instance).objects.filter(pk=instance.pk).update(
+                    **{f'{field_name}_renditions': {}}
+                )
+                self.delete_files(field_file.storage, renditions, {})
+            return
+        if renditions.get('source') == field_file.name or \
+                not self.get_sizes(kind):
+            return
+        task = partial(self.process, type(instance), instance.pk,
+                       field_name, kind)
+        if getattr(settings, 'IMAGE_RENDITIONS_ASYNC', True):
+            transaction.on_commit(lambda: self.executor.submit(task))
+        else:
+            transaction.on_commit(task)
+
+
+rendition_pipeline = RenditionPipeline()
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_renditions(sender, instance, **kwargs):
+    rendition_pipeline.schedule(instance, 'image', 'recipe')
+
+
+@receiver(post_save, sender=User)
+def schedule_avatar_renditions(sender, instance, **kwargs):
+    rendition_pipeline.schedule(instance, 'avatar', 'avatar')
+
+
+def get_rendition_urls(renditions, request=None):
+    urls = {}
+    for size_name, files in renditions.items():
+        if size_name == 'source':
+            continue
+        urls[size_name] = {}
+        for extension, name in files.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[size_name][extension] = url
+    return urls
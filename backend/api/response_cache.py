@@ -0,0 +1,168 @@
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+from recipes.models import Ingredient, Recipe, UsedIngredients
+from users.models import User
+from .cache_utils import aincr, incr
+
+PROFILE_FIELDS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+
+
+class ResponseCache:
+    prefix = 'response_cache'
+    stored_headers = ('ETag', 'Last-Modified')
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    def tag_key(self, tag):
+        return f'{self.prefix}:tag:{tag}'
+
+    def tag_versions(self, tags):
+        keys = [self.tag_key(tag) for tag in tags]
+        versions = cache.get_many(keys)
+        missing = {key: uuid4().hex for key in keys if key not in versions}
+        if missing:
+            cache.set_many(missing, None)
+            versions.update(missing)
+        return [versions[key] for key in keys]
+
+    async def atag_versions(self, tags):
+        keys = [self.tag_key(tag) for tag in tags]
+        versions = await cache.aget_many(keys)
+        missing = {key: uuid4().hex for key in keys if key not in versions}
+        if missing:
+            await cache.aset_many(missing, None)
+            versions.update(missing)
+        return [versions[key] for key in keys]
+
+    def invalidate(self, *tags):
+        cache.set_many(
+            {self.tag_key(tag): uuid4().hex for tag in tags}, None
+        )
+
+    def invalidate_on_commit(self, *tags):
+        transaction.on_commit(partial(self.invalidate, *tags))
+
+    def get_key(self, request):
+        query = urlencode(sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        ))
+        raw = f'{request.get_host()}{request.path}?{query}'
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f'{self.prefix}:response:{digest}'
+
+    def count(self, name):
+        key = f'{self.prefix}:{name}'
+        incr(key)
+
+    async def acount(self, name):
+        key = f'{self.prefix}:{name}'
+        await aincr(key)
+
+    def stats(self):
+        names = ('hits', 'misses')
+        values = cache.get_many([f'{self.prefix}:{name}' for name in names])
+        return {
+            name: values.get(f'{self.prefix}:{name}', 0) for name in names
+        }
+
+    def is_cacheable(self, request):
+        return request.method == 'GET' and not request.user.is_authenticated
+
+    def make_entry(self, versions, response):
+        headers = {
+            header: response[header]
+            for header in self.stored_headers if header in response
+        }
+        return versions, response.data, headers
+
+    def from_entry(self, request, entry):
+        response = Response(entry[1], headers=entry[2])
+        response['X-Cache'] = 'HIT'
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified')),
+            response=response,
+        )
+
+    def serve(self, request, tags, view):
+        if not self.is_cacheable(request):
+            return view()
+        key = self.get_key(request)
+        versions = self.tag_versions(tags)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == versions:
+            self.count('hits')
+            return self.from_entry(request, entry)
+        self.count('misses')
+        response = view()
+        if response.status_code == 200:
+            cache.set(key, self.make_entry(versions, response), self.timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def aserve(self, request, tags, view):
+        if not self.is_cacheable(request):
+            return await view()
+        key = self.get_key(request)
+        versions = await self.atag_versions(tags)
+        entry = await cache.aget(key)
+        if entry is not None and entry[0] == versions:
+            await self.acount('hits')
+            return self.from_entry(request, entry)
+        await self.acount('misses')
+        response = await view()
+        if response.status_code == 200:
+            await cache.aset(key, self.make_entry(versions, response),
+                             self.timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+response_cache = ResponseCache()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    response_cache.invalidate_on_commit('recipes', f'recipe:{instance.id}')
+
+
+@receiver(post_save, sender=UsedIngredients)
+@receiver(post_delete, sender=UsedIngredients)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    response_cache.invalidate_on_commit(
+        'recipes', f'recipe:{instance.recipe_id}'
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient(sender, instance, **kwargs):
+    response_cache.invalidate_on_commit('recipes', 'ingredients')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not PROFILE_FIELDS & set(update_fields):
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        response_cache.invalidate_on_commit(
+            'recipes', *(f'recipe:{recipe_id}' for recipe_id in recipe_ids)
+        )
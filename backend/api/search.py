@@ -0,0 +1,167 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<mark>', '</mark>'
+MATCH_START, MATCH_STOP = '\ue000', '\ue001'
+
+
+def render_highlight(value):
+    if value is None:
+        return None
+    return escape(value).replace(
+        MATCH_START, HIGHLIGHT_START
+    ).replace(MATCH_STOP, HIGHLIGHT_STOP)
+
+
+def render_highlights(rows):
+    return {
+        recipe_id: {
+            'name': render_highlight(name), 'text': render_highlight(text),
+        }
+        for recipe_id, name, text in rows
+    }
+
+
+def no_results(queryset):
+    return queryset.none().annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+class PostgreSQLRecipeSearch:
+    config = 'russian'
+    match_sql = (
+        'SELECT recipe_id FROM recipes_recipesearchdocument '
+        'WHERE search_vector @@ websearch_to_tsquery(%s::regconfig, %s)'
+    )
+    rank_sql = (
+        'SELECT ts_rank_cd(search_vector, '
+        'websearch_to_tsquery(%s::regconfig, %s)) '
+        'FROM recipes_recipesearchdocument '
+        'WHERE recipe_id = recipes_recipe.id'
+    )
+    headline_sql = (
+        'SELECT recipe_id, ts_headline(%s::regconfig, name, query, %s), '
+        'ts_headline(%s::regconfig, text, query, %s) '
+        'FROM recipes_recipesearchdocument, '
+        'websearch_to_tsquery(%s::regconfig, %s) AS query '
+        'WHERE recipe_id = ANY(%s)'
+    )
+    name_options = (
+        f'StartSel={MATCH_START}, StopSel={MATCH_STOP}, HighlightAll=true'
+    )
+    text_options = (
+        f'StartSel={MATCH_START}, StopSel={MATCH_STOP}, '
+        'MaxFragments=2, MaxWords=20, MinWords=8'
+    )
+
+    def filter(self, queryset, query):
+        params = [self.config, query]
+        return queryset.filter(
+            id__in=RawSQL(self.match_sql, params)
+        ).annotate(
+            search_rank=RawSQL(self.rank_sql, params,
+                               output_field=FloatField())
+        )
+
+    def highlights(self, recipe_ids, query):
+        with connection.cursor() as cursor:
+            cursor.execute(self.headline_sql, [
+                self.config, self.name_options,
+                self.config, self.text_options,
+                self.config, query, list(recipe_ids),
+            ])
+            return render_highlights(cursor.fetchall())
+
+
+class SQLiteRecipeSearch:
+    weights = (10.0, 1.0, 4.0)
+    match_sql = (
+        'SELECT rowid FROM recipes_recipesearch_fts '
+        'WHERE recipes_recipesearch_fts MATCH %s'
+    )
+    rank_sql = (
+        'SELECT -bm25(recipes_recipesearch_fts, %s, %s, %s) '
+        'FROM recipes_recipesearch_fts '
+        'WHERE recipes_recipesearch_fts MATCH %s '
+        'AND rowid = recipes_recipe.id'
+    )
+    headline_sql = (
+        'SELECT rowid, highlight(recipes_recipesearch_fts, 0, %s, %s), '
+        "snippet(recipes_recipesearch_fts, 1, %s, %s, '…', 20) "
+        'FROM recipes_recipesearch_fts '
+        'WHERE recipes_recipesearch_fts MATCH %s AND rowid IN ({})'
+    )
+
+    def to_match(self, query):
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def filter(self, queryset, query):
+        match = self.to_match(query)
+        if not match:
+            return no_results(queryset)
+        return queryset.filter(
+            id__in=RawSQL(self.match_sql, [match])
+        ).annotate(
+            search_rank=RawSQL(self.rank_sql, [*self.weights, match],
+                               output_field=FloatField())
+        )
+
+    def highlights(self, recipe_ids, query):
+        match = self.to_match(query)
+        recipe_ids = list(recipe_ids)
+        if not match or not recipe_ids:
+            return {}
+        sql = self.headline_sql.format(', '.join(['%s'] * len(recipe_ids)))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                MATCH_START, MATCH_STOP, MATCH_START, MATCH_STOP,
+                match, *recipe_ids,
+            ])
+            return render_highlights(cursor.fetchall())
+
+
+class FallbackRecipeSearch:
+
+    def filter(self, queryset, query):
+        terms = query.split()
+        if not terms:
+            return no_results(queryset)
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(search_document__name__icontains=term)
+                | Q(search_document__text__icontains=term)
+                | Q(search_document__ingredients__icontains=term)
+            )
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    def highlights(self, recipe_ids, query):
+        return {}
+
+
+BACKENDS = {
+    'postgresql': PostgreSQLRecipeSearch,
+    'sqlite': SQLiteRecipeSearch,
+}
+
+
+def get_recipe_search():
+    return BACKENDS.get(connection.vendor, FallbackRecipeSearch)()
+
+
+def search_recipes(queryset, query):
+    return get_recipe_search().filter(queryset, query).order_by(
+        '-search_rank', '-pub_date', '-id'
+    )
+
+
+def get_search_highlights(recipe_ids, query):
+    return get_recipe_search().highlights(recipe_ids, query)
@@ -1,9 +1,15 @@
+from django.db import transaction
+from django.db.models import F, Prefetch, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 from recipes.models import (Recipe, Ingredient,
                             UsedIngredients, Favorite,
-                            ShoppingCart)
-from users.models import User, Follow
-from drf_extra_fields.fields import Base64ImageField
+                            ShoppingCart, ShoppingListItem)
+from users.models import User
+from .fields import StreamingBase64ImageField
+from .membership import MembershipResolver, MembershipListSerializer
+from .recipe_matcher import recipe_matcher
+from .renditions import get_rendition_urls
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -13,6 +19,18 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
 
 
+class RenditionsMixin:
+
+    def get_renditions(self, renditions):
+        return get_rendition_urls(renditions, self.context.get('request'))
+
+    def get_image_renditions(self, obj):
+        return self.get_renditions(obj.image_renditions)
+
+    def get_avatar_renditions(self, obj):
+        return self.get_renditions(obj.avatar_renditions)
+
+
 class UsedIngredientsSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='ingredient.id')
@@ -29,7 +47,7 @@ class UsedIngredientsSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(RenditionsMixin, serializers.ModelSerializer):
     author = serializers.SerializerMethodField(
         read_only=True,
     )
@@ -37,18 +55,29 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = UsedIngredientsSerializer(source='recipeName',
                                             many=True, read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     def get_author(self, obj):
         return UserSerializer(obj.author, context=self.context).data
 
     def get_is_favorited(self, obj):
-        return obj.id in self.context.get('is_favorited_ids', set())
+        return MembershipResolver.from_context(
+            self.context).is_favorited(obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return False
-        return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
+        return MembershipResolver.from_context(
+            self.context).is_in_shopping_cart(obj.id)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        extra_fields = self.context.get('extra_fields')
+        if extra_fields is not None:
+            data.update(extra_fields.get(instance.id, {}))
+        return data
+
+    def get_membership_ids(self, recipes):
+        return ([recipe.id for recipe in recipes],
+                [recipe.author_id for recipe in recipes])
 
     class Meta:
         fields = (
@@ -56,6 +85,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'author',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time',
             'ingredients',
@@ -63,24 +93,46 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
         )
         model = Recipe
+        list_serializer_class = MembershipListSerializer
+
+
+class UsedIngredientsListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item['ingredient'] for item in items}
+        )
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+        errors = [
+            {} if item['ingredient'] in ingredients
+            else {'id': [message.format(pk_value=item['ingredient'])]}
+            for item in items
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in items:
+            item['ingredient'] = ingredients[item['ingredient']]
+        return items
 
 
 class UsedIngredientsCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient')
+    id = serializers.IntegerField(source='ingredient')
 
     class Meta:
         model = UsedIngredients
         fields = (
             'id', 'amount')
+        list_serializer_class = UsedIngredientsListSerializer
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = UsedIngredientsCreateSerializer(
         many=True
     )
-    image = Base64ImageField(required=True)
+    image = StreamingBase64ImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -110,42 +162,80 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 amount=item['amount']
             ) for item in ingredients
         ])
+        recipe_matcher.publish_on_commit(
+            recipe.id, added=[item['ingredient'].id for item in ingredients]
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(recipe, ingredients_data)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        existing = {item.ingredient_id: item
+                    for item in recipe.recipeName.all()}
+        old_amounts = {ingredient_id: item.amount
+                       for ingredient_id, item in existing.items()}
+        new_amounts = {item['ingredient'].id: item['amount']
+                       for item in ingredients}
+        to_create, to_update = [], []
+        for ingredient_id, amount in new_amounts.items():
+            item = existing.get(ingredient_id)
+            if item is None:
+                to_create.append(UsedIngredients(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+            elif item.amount != amount:
+                item.amount = amount
+                to_update.append(item)
+        to_delete = [item.id for ingredient_id, item in existing.items()
+                     if ingredient_id not in new_amounts]
+        if to_delete:
+            UsedIngredients.objects.filter(id__in=to_delete).delete()
+        UsedIngredients.objects.bulk_update(to_update, ['amount'])
+        UsedIngredients.objects.bulk_create(to_create)
+        recipe_matcher.publish_on_commit(
+            recipe.id, added=[item.ingredient_id for item in to_create]
+        )
+        ShoppingListItem.objects.apply_recipe_change(
+            recipe.id, old_amounts, new_amounts
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
         if ingredients_data is not None:
-            instance.recipeName.all().delete()
-            self.create_ingredients(instance, ingredients_data)
-            return instance
-        else:
-            raise serializers.ValidationError()
+            self.update_ingredients(instance, ingredients_data)
+        instance.save()
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], Prefetch(
+            'recipeName',
+            queryset=UsedIngredients.objects.select_related('ingredient'),
+        ))
         return RecipeSerializer(instance, context=self.context).data
 
 
-class CuttedRecipesSerializer(serializers.ModelSerializer):
+class CuttedRecipesSerializer(RenditionsMixin, serializers.ModelSerializer):
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'name',
-            'image', 'cooking_time',
+            'image', 'image_renditions', 'cooking_time',
         )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(RenditionsMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.ImageField(read_only=True)
+    avatar_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -157,13 +247,16 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_renditions',
         )
+        list_serializer_class = MembershipListSerializer
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return Follow.objects.filter(user=request.user, follower=obj).exists()
+        return MembershipResolver.from_context(
+            self.context).is_subscribed(obj.id)
+
+    def get_membership_ids(self, users):
+        return (), [user.id for user in users]
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -193,10 +286,11 @@ class PasswordSetSerializer(serializers.Serializer):
     new_password = serializers.CharField(write_only=True)
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(RenditionsMixin, serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
+    avatar_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -204,28 +298,45 @@ class FollowSerializer(serializers.ModelSerializer):
             'email', 'id', 'username',
             'first_name', 'last_name',
             'is_subscribed', 'recipes',
-            'recipes_count', 'avatar',
+            'recipes_count', 'avatar', 'avatar_renditions',
         )
+        list_serializer_class = MembershipListSerializer
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return user.is_authenticated and \
-            obj.follower.filter(user=user).exists()
+        return MembershipResolver.from_context(
+            self.context).is_subscribed(obj.id)
 
-    def get_recipes(self, obj):
-        limit = self.context.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj)
+    def get_membership_ids(self, users):
+        return (), [user.id for user in users]
+
+    @staticmethod
+    def get_recipes_by_author(author_ids, limit):
+        recipes = Recipe.objects.filter(author_id__in=author_ids)
         if limit is not None and limit.isdigit():
-            recipes = recipes[:int(limit)]
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            )).filter(row_number__lte=int(limit))
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
+    def get_recipes(self, obj):
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None and obj.id in recipes_by_author:
+            recipes = recipes_by_author[obj.id]
+        else:
+            recipes = self.get_recipes_by_author(
+                [obj.id], self.context.get('recipes_limit')
+            )[obj.id]
         return CuttedRecipesSerializer(
             recipes,
             many=True,
             context=self.context,
         ).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class FavoriteSerializer(serializers.ModelSerializer):
 
@@ -235,17 +346,56 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
 
 class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField()
+    avatar = StreamingBase64ImageField()
 
     class Meta:
         model = User
         fields = ('avatar',)
 
 
+class RecipeMatchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1,
+        max_length=100,
+    )
+    exclude = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        max_length=100,
+    )
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, required=False, default=0,
+    )
+
+
+class BulkRelationSerializer(serializers.Serializer):
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        max_length=500,
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        max_length=500,
+    )
+
+    def validate(self, data):
+        add = list(dict.fromkeys(data.get('add', [])))
+        remove = list(dict.fromkeys(data.get('remove', [])))
+        if not add and not remove:
+            raise serializers.ValidationError(
+                'Передайте идентификаторы в add или remove.'
+            )
+        if set(add) & set(remove):
+            raise serializers.ValidationError(
+                'Один идентификатор не может быть в add и remove.'
+            )
+        return {'add': add, 'remove': remove}
+
+
 class UserToRecipeSerializer(serializers.Serializer):
 
     class Meta:
         fields = ('user', 'recipe')
+        validators = []
 
     def validate(self, data, related_name):
         user = data.get("user")
@@ -0,0 +1,125 @@
+import csv
+import hashlib
+import io
+import json
+
+from django.conf import settings
+from django.db.models import F
+from PIL import Image, ImageDraw, ImageFont
+from rest_framework.renderers import BaseRenderer
+from recipes.models import ShoppingListItem
+from users.models import User
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class TXTRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+def get_shopping_list(user):
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(totalSum=F('total_amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def get_shopping_list_etag(user, file_format):
+    version = User.objects.filter(id=user.id).values_list(
+        'shopping_list_version', flat=True
+    ).first()
+    key = json.dumps([user.id, file_format, version])
+    return '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+
+
+def iter_rows(ingredients):
+    for item in ingredients.iterator():
+        yield (item['ingredient__name'],
+               item['ingredient__measurement_unit'],
+               item['totalSum'])
+
+
+def stream_txt(ingredients):
+    for name, unit, amount in iter_rows(ingredients):
+        yield f'{name} — {amount} ({unit})\n'
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in iter_rows(ingredients):
+        yield writer.writerow(row)
+
+
+def stream_json(ingredients):
+    separator = '['
+    for name, unit, amount in iter_rows(ingredients):
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False,
+        )
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+def build_pdf(ingredients):
+    font_path = getattr(settings, 'SHOPPING_LIST_PDF_FONT', None)
+    try:
+        font = ImageFont.truetype(font_path, 28)
+    except (OSError, TypeError, ValueError):
+        font = ImageFont.load_default(size=28)
+    width, height, margin, line_height = 1240, 1754, 100, 44
+    lines_per_page = (height - 2 * margin) // line_height
+    lines = [f'{name} — {amount} ({unit})'
+             for name, unit, amount in iter_rows(ingredients)]
+    pages = []
+    for start in range(0, max(len(lines), 1), lines_per_page):
+        page = Image.new('L', (width, height), 255)
+        draw = ImageDraw.Draw(page)
+        for number, line in enumerate(lines[start:start + lines_per_page]):
+            draw.text((margin, margin + number * line_height), line,
+                      font=font, fill=0)
+        pages.append(page)
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', save_all=True,
+                  append_images=pages[1:], resolution=150)
+    return buffer.getvalue()
+
+
+STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
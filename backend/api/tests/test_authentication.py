@@ -0,0 +1,60 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    url = '/api/users/me/'
+
+    def setUp(self):
+        for alias in ('default', 'auth_tokens'):
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='password',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_auth_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'authtoken_token' in query['sql']
+            or 'FROM "users_user"' in query['sql']
+        ]
+
+    def test_cache_hit_does_not_query_auth(self):
+        self.assertEqual(len(self.get_auth_queries()), 1)
+        self.assertEqual(self.get_auth_queries(), [])
+
+    def test_password_change_invalidates_cache(self):
+        self.get_auth_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/set_password/', {
+                'current_password': 'password',
+                'new_password': 'new-password-123',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(self.get_auth_queries()), 1)
+
+    def test_deactivation_invalidates_cache(self):
+        self.get_auth_queries()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_logout_invalidates_cache(self):
+        self.get_auth_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
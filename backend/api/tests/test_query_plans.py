@@ -0,0 +1,108 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from api.recipeFilter import IngredientFilter, RecipeFilter
+from api.views import RecipeViewSet, UserViewSet
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeRanking,
+                            ShoppingCart)
+from users.models import Follow, User
+
+
+@skipUnless(connection.vendor in ('postgresql', 'sqlite'),
+            'Проверка планов поддерживается для PostgreSQL и SQLite.')
+class QueryPlanTests(TestCase):
+    users_count = 200
+    recipes_count = 2000
+    ingredients_count = 2000
+    prefixes = ('соль', 'сахар', 'мука', 'масло')
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(email=f'user{number}@example.com',
+                 username=f'user{number}', first_name='Имя',
+                 last_name='Фамилия')
+            for number in range(cls.users_count)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=users[number % len(users)],
+                   name=f'Рецепт {number}', text='Описание',
+                   image='recipes/test.png', cooking_time=10)
+            for number in range(cls.recipes_count)
+        )
+        RecipeRanking.objects.bulk_create(
+            RecipeRanking(recipe=recipe, popular_score=number % 37,
+                          trending_score=number % 11)
+            for number, recipe in enumerate(recipes)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'{cls.prefixes[number % len(cls.prefixes)]} '
+                            f'{number}', measurement_unit='г')
+            for number in range(cls.ingredients_count)
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=users[number % len(users)], recipe=recipe)
+            for number, recipe in enumerate(recipes)
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=users[number % len(users)], recipe=recipe)
+            for number, recipe in enumerate(recipes[::2])
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, follower=users[(number + step) % len(users)])
+            for number, user in enumerate(users)
+            for step in range(1, 6)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user, cls.author = users[0], users[1]
+
+    def get_recipes(self, params):
+        request = RequestFactory().get('/api/recipes/', params)
+        request.user = self.user
+        view = RecipeViewSet(action='list', request=request,
+                             format_kwarg=None)
+        return RecipeFilter(
+            params, queryset=view.get_queryset(), request=request
+        ).qs[:self.page_size]
+
+    def get_checks(self):
+        return [
+            ('recipes:list', self.get_recipes({})),
+            ('recipes:popular', self.get_recipes({'ordering': 'popular'})),
+            ('recipes:trending', self.get_recipes({'ordering': 'trending'})),
+            ('recipes:author',
+             self.get_recipes({'author': str(self.author.id)})),
+            ('recipes:favorited', self.get_recipes({'is_favorited': '1'})),
+            ('recipes:in_shopping_cart',
+             self.get_recipes({'is_in_shopping_cart': '1'})),
+            ('users:subscriptions',
+             UserViewSet().get_subscriptions(self.user)[:self.page_size]),
+            ('ingredients:search',
+             IngredientFilter({'name': 'сол'},
+                              queryset=Ingredient.objects.all()).qs),
+        ]
+
+    def has_full_scan(self, queryset, plan):
+        if connection.vendor == 'postgresql':
+            return 'Seq Scan' in plan
+        lines = plan.splitlines()
+        ordered_walk = queryset.query.high_mark is not None and not any(
+            'TEMP B-TREE FOR ORDER BY' in line for line in lines
+        )
+        for position, line in enumerate(lines):
+            if ' SCAN ' not in f' {line}':
+                continue
+            if position == 0 and ' USING ' in line and ordered_walk:
+                continue
+            return True
+        return False
+
+    def test_main_queries_use_indexes(self):
+        for name, queryset in self.get_checks():
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                self.assertFalse(self.has_full_scan(queryset, plan), plan)
@@ -0,0 +1,123 @@
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.test import APIClient
+from recipes.models import (Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, UsedIngredients)
+from users.models import User
+
+
+class RecipeIngredientsUpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.buyer, cls.other_buyer = [
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='password',
+            )
+            for name in ('author', 'buyer', 'other_buyer')
+        ]
+        cls.salt, cls.sugar, cls.flour, cls.butter = (
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit='г')
+                for name in ('соль', 'сахар', 'мука', 'масло')
+            )
+        )
+
+    def setUp(self):
+        for alias in ('default', 'auth_tokens'):
+            caches[alias].clear()
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Пирог', text='Описание',
+            image='recipes/test.png', cooking_time=30,
+        )
+        UsedIngredients.objects.bulk_create([
+            UsedIngredients(recipe=self.recipe, ingredient=self.salt,
+                            amount=1),
+            UsedIngredients(recipe=self.recipe, ingredient=self.sugar,
+                            amount=2),
+            UsedIngredients(recipe=self.recipe, ingredient=self.flour,
+                            amount=3),
+        ])
+        other_recipe = Recipe.objects.create(
+            author=self.author, name='Хлеб', text='Описание',
+            image='recipes/test.png', cooking_time=60,
+        )
+        UsedIngredients.objects.create(recipe=other_recipe,
+                                       ingredient=self.flour, amount=10)
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.other_buyer,
+                                    recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.other_buyer,
+                                    recipe=other_recipe)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_ingredients(self):
+        return {
+            item.ingredient_id: item
+            for item in UsedIngredients.objects.filter(recipe=self.recipe)
+        }
+
+    def get_shopping_list(self, user):
+        return dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient_id', 'total_amount'
+        ))
+
+    def update(self, ingredients):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'ingredients': [{'id': ingredient.id, 'amount': amount}
+                             for ingredient, amount in ingredients]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_update_applies_only_the_difference(self):
+        before = self.get_ingredients()
+        self.update([(self.salt, 1), (self.sugar, 5), (self.butter, 4)])
+        after = self.get_ingredients()
+        self.assertEqual(
+            {ingredient_id: item.amount
+             for ingredient_id, item in after.items()},
+            {self.salt.id: 1, self.sugar.id: 5, self.butter.id: 4},
+        )
+        self.assertEqual(after[self.salt.id].id, before[self.salt.id].id)
+        self.assertEqual(after[self.sugar.id].id, before[self.sugar.id].id)
+        self.assertNotIn(self.flour.id, after)
+
+    def test_update_moves_shopping_lists_by_deltas(self):
+        self.update([(self.salt, 1), (self.sugar, 5), (self.butter, 4)])
+        self.assertEqual(self.get_shopping_list(self.buyer), {
+            self.salt.id: 1, self.sugar.id: 5, self.butter.id: 4,
+        })
+        self.assertEqual(self.get_shopping_list(self.other_buyer), {
+            self.salt.id: 1, self.sugar.id: 5, self.butter.id: 4,
+            self.flour.id: 10,
+        })
+
+    def test_unchanged_ingredients_leave_shopping_lists_alone(self):
+        version = User.objects.get(pk=self.buyer.pk).shopping_list_version
+        self.update([(self.salt, 1), (self.sugar, 2), (self.flour, 3)])
+        self.assertEqual(
+            User.objects.get(pk=self.buyer.pk).shopping_list_version,
+            version,
+        )
+
+    def test_apply_recipe_change_skips_zero_deltas(self):
+        with self.assertNumQueries(0):
+            ShoppingListItem.objects.apply_recipe_change(
+                self.recipe.id, {self.salt.id: 1}, {self.salt.id: 1}
+            )
+
+    def test_apply_recipe_change_removes_exhausted_items(self):
+        ShoppingListItem.objects.apply_recipe_change(
+            self.recipe.id,
+            {self.salt.id: 1, self.sugar.id: 2, self.flour.id: 3},
+            {self.salt.id: 2},
+        )
+        self.assertEqual(self.get_shopping_list(self.buyer),
+                         {self.salt.id: 2})
+        self.assertEqual(self.get_shopping_list(self.other_buyer),
+                         {self.salt.id: 2, self.flour.id: 10})
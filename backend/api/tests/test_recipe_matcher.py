@@ -0,0 +1,124 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from api.recipe_matcher import (RecipeMatcher, RecipeMatches, skip_bits,
+                                take_bits, to_bitmap)
+from recipes.models import Ingredient, Recipe, UsedIngredients
+from users.models import User
+
+
+class BitmapTests(SimpleTestCase):
+
+    def test_to_bitmap_sets_recipe_bits(self):
+        self.assertEqual(to_bitmap([1, 3, 8]), 0b100001010)
+        self.assertEqual(to_bitmap([]), 0)
+
+    def test_take_bits_returns_highest_positions_first(self):
+        bitmap = to_bitmap([1, 3, 8, 20])
+        self.assertEqual(take_bits(bitmap, 2), [20, 8])
+        self.assertEqual(take_bits(bitmap, 10), [20, 8, 3, 1])
+        self.assertEqual(take_bits(0, 3), [])
+
+    def test_skip_bits_drops_highest_positions(self):
+        bitmap = to_bitmap([1, 3, 8, 20])
+        self.assertEqual(skip_bits(bitmap, 0), bitmap)
+        self.assertEqual(skip_bits(bitmap, 1), to_bitmap([1, 3, 8]))
+        self.assertEqual(skip_bits(bitmap, 3), to_bitmap([1]))
+        self.assertEqual(skip_bits(bitmap, 4), 0)
+        self.assertEqual(skip_bits(bitmap, 10), 0)
+
+    def test_matches_slice_across_groups(self):
+        matches = RecipeMatches([
+            (1.0, 2, to_bitmap([2, 5])),
+            (0.5, 1, to_bitmap([1, 4, 7])),
+        ])
+        self.assertEqual(len(matches), 5)
+        self.assertEqual(matches[1:4], [
+            (1.0, 2, 2), (0.5, 1, 7), (0.5, 1, 4),
+        ])
+        self.assertEqual(matches[4], (0.5, 1, 1))
+        self.assertEqual(matches[5:10], [])
+
+
+class RecipeMatcherTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        )
+        cls.pair, cls.full, cls.single = Recipe.objects.bulk_create(
+            Recipe(author=author, name=name, text='Описание',
+                   image='recipes/test.png', cooking_time=10)
+            for name in ('Пара', 'Полный', 'Один')
+        )
+        UsedIngredients.objects.bulk_create(
+            UsedIngredients(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe, ingredients in (
+                (cls.pair, cls.ingredients[:2]),
+                (cls.full, cls.ingredients),
+                (cls.single, cls.ingredients[2:3]),
+            )
+            for ingredient in ingredients
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.matcher = RecipeMatcher()
+
+    def match(self, ingredients, exclude=(), min_coverage=0.0):
+        return list(self.matcher.match(
+            [ingredient.id for ingredient in ingredients],
+            [ingredient.id for ingredient in exclude], min_coverage,
+        )[:10])
+
+    def test_coverage_orders_matches(self):
+        self.assertEqual(self.match(self.ingredients[:2]), [
+            (1.0, 2, self.pair.id), (0.5, 2, self.full.id),
+        ])
+        self.assertEqual(self.match(self.ingredients[1:3]), [
+            (1.0, 1, self.single.id), (0.5, 2, self.full.id),
+            (0.5, 1, self.pair.id),
+        ])
+
+    def test_min_coverage_and_exclude_filter_matches(self):
+        self.assertEqual(
+            self.match(self.ingredients[:2], min_coverage=0.6),
+            [(1.0, 2, self.pair.id)],
+        )
+        self.assertEqual(
+            self.match(self.ingredients[:2], exclude=self.ingredients[3:]),
+            [(1.0, 2, self.pair.id)],
+        )
+
+    def test_sequence_bump_applies_published_changes(self):
+        self.match(self.ingredients[:1])
+        with self.captureOnCommitCallbacks(execute=True):
+            UsedIngredients.objects.create(
+                recipe=self.single, ingredient=self.ingredients[0], amount=1
+            )
+            UsedIngredients.objects.filter(
+                recipe=self.pair, ingredient=self.ingredients[1]
+            ).delete()
+        with self.assertNumQueries(0):
+            matches = self.match(self.ingredients[:1])
+        self.assertEqual(matches, [
+            (1.0, 1, self.pair.id), (0.5, 1, self.single.id),
+            (0.25, 1, self.full.id),
+        ])
+
+    def test_sequence_reset_rebuilds_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UsedIngredients.objects.filter(recipe=self.full).delete()
+        self.match(self.ingredients[:1])
+        UsedIngredients.objects.filter(recipe=self.pair).exclude(
+            ingredient=self.ingredients[0]
+        ).delete()
+        caches['default'].clear()
+        with self.assertNumQueries(1):
+            matches = self.match(self.ingredients[:1])
+        self.assertEqual(matches, [(1.0, 1, self.pair.id)])
@@ -0,0 +1,90 @@
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.test import APIClient
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            UsedIngredients)
+from users.models import Follow, User
+
+
+class RecipeQueryCountTests(TestCase):
+    page_sizes = (6, 50, 100)
+    anonymous_queries = 3
+    authenticated_queries = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}', first_name='Автор',
+                last_name='Рецептов', password='password',
+            )
+            for number in range(10)
+        ]
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='password',
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(20)
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}', text='Описание',
+                image='recipes/test.png', cooking_time=10,
+            )
+            for number in range(max(cls.page_sizes))
+        ]
+        UsedIngredients.objects.bulk_create(
+            UsedIngredients(
+                recipe=recipe, amount=offset + 1,
+                ingredient=ingredients[(number + offset) % len(ingredients)],
+            )
+            for number, recipe in enumerate(cls.recipes)
+            for offset in range(3)
+        )
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        for recipe in cls.recipes[::3]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in authors[::2]:
+            Follow.objects.create(user=cls.user, follower=author)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.anonymous = APIClient()
+        self.authenticated = APIClient()
+        self.authenticated.force_authenticate(self.user)
+
+    def get_clients(self):
+        return (
+            ('anonymous', self.anonymous, self.anonymous_queries),
+            ('authenticated', self.authenticated, self.authenticated_queries),
+        )
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        for name, client, queries in self.get_clients():
+            for page_size in self.page_sizes:
+                with self.subTest(client=name, page_size=page_size):
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            f'/api/recipes/?limit={page_size}'
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['results']),
+                                     page_size)
+                    for cache in caches.all():
+                        cache.clear()
+
+    def test_retrieve_query_count(self):
+        for name, client, queries in self.get_clients():
+            with self.subTest(client=name):
+                with self.assertNumQueries(queries):
+                    response = client.get(
+                        f'/api/recipes/{self.recipes[0].id}/'
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['ingredients']), 3)
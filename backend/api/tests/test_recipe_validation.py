@@ -0,0 +1,84 @@
+from django.test import TestCase
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from api.serializers import UsedIngredientsCreateSerializer
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+class IngredientValidationTests(TestCase):
+    missing_id = 999999
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salt, cls.sugar = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар')
+        )
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+
+    def get_serializer(self, items):
+        return UsedIngredientsCreateSerializer(data=[
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in items
+        ], many=True)
+
+    def get_missing_error(self, pk):
+        return serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ].format(pk_value=pk)
+
+    def test_ingredients_are_resolved_with_one_query(self):
+        serializer = self.get_serializer(
+            [(self.salt.id, 1), (self.sugar.id, 2)]
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(
+            [(item['ingredient'], item['amount'])
+             for item in serializer.validated_data],
+            [(self.salt, 1), (self.sugar, 2)],
+        )
+
+    def test_unknown_ids_map_to_their_items(self):
+        serializer = self.get_serializer([
+            (self.salt.id, 1), (self.missing_id, 2), (self.sugar.id, 3),
+            (self.missing_id + 1, 4),
+        ])
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, [
+            {},
+            {'id': [self.get_missing_error(self.missing_id)]},
+            {},
+            {'id': [self.get_missing_error(self.missing_id + 1)]},
+        ])
+
+    def test_field_errors_are_reported_before_lookup(self):
+        serializer = self.get_serializer(
+            [(self.salt.id, 0), (self.missing_id, 1)]
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(list(serializer.errors[0]), ['amount'])
+        self.assertEqual(serializer.errors[1], {})
+
+    def test_recipe_endpoint_returns_item_errors(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.post('/api/recipes/', {
+            'name': 'Пирог', 'text': 'Описание', 'cooking_time': 30,
+            'image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAAB'
+                     'CAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5E'
+                     'rkJggg==',
+            'ingredients': [{'id': self.salt.id, 'amount': 1},
+                            {'id': self.missing_id, 'amount': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ingredients'], [
+            {}, {'id': [self.get_missing_error(self.missing_id)]},
+        ])
+        self.assertFalse(Recipe.objects.exists())
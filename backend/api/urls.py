@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
-from .views import (IngredientViewSet, RecipeViewSet, UserViewSet)
+from .views import (IngredientViewSet, RecipeViewSet, UserViewSet,
+                    CacheStatsView, MetricsView)
 
 router = routers.DefaultRouter()
 router.register('ingredients', IngredientViewSet)
@@ -9,6 +11,30 @@ router.register('users', UserViewSet)
 
 
 urlpatterns = [
+    path('cache-stats/', CacheStatsView.as_view()),
+    path('metrics/', MetricsView.as_view()),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import (IngredientListView, RecipeDetailView,
+                              RecipeLinkView, RecipeListView)
+
+    urlpatterns = [
+        path('ingredients/', IngredientListView.as_view()),
+        path('recipes/', RecipeListView.as_view(
+            fallback=RecipeViewSet.as_view(
+                {'get': 'list', 'post': 'create'},
+                basename='recipe', detail=False,
+            ),
+        )),
+        path('recipes/<int:pk>/', RecipeDetailView.as_view(
+            fallback=RecipeViewSet.as_view(
+                {'get': 'retrieve', 'put': 'update',
+                 'patch': 'partial_update', 'delete': 'destroy'},
+                basename='recipe', detail=True,
+            ),
+        )),
+        path('recipes/<int:pk>/get-link/', RecipeLinkView.as_view()),
+    ] + urlpatterns
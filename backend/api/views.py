@@ -1,35 +1,63 @@
+from functools import partial
 from rest_framework import viewsets, status
+from rest_framework.views import APIView
 from .serializers import (RecipeSerializer, IngredientSerializer,
                           UserSerializer, UserRegisterSerializer,
                           PasswordSetSerializer, FollowSerializer,
                           RecipeCreateSerializer, CuttedRecipesSerializer,
                           AvatarSerializer, ShoppingCartSerializer,
+                          BulkRelationSerializer, RecipeMatchSerializer,
                           UsedIngredients)
 from recipes.models import Recipe, Ingredient, Favorite, ShoppingCart
 from users.models import User, Follow
 from users.permissions import IsAuthorOrReadOnly
 from rest_framework.permissions import (IsAuthenticated, AllowAny,
-                                        IsAuthenticatedOrReadOnly)
+                                        IsAuthenticatedOrReadOnly,
+                                        IsAdminUser)
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum
-from django.http import FileResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.http import parse_etags
 from rest_framework.exceptions import NotFound
 from django.shortcuts import get_object_or_404
-import tempfile
 from django_filters.rest_framework import DjangoFilterBackend
 from .recipeFilter import RecipeFilter, IngredientFilter
-
-
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+from .ingredient_index import ingredient_index
+from .bulk_relations import apply_bulk_relation
+from .conditional import ConditionalGetMixin
+from .feed import RecipeFeed
+from .membership import MembershipResolver
+from .metrics import (RequestMetricsMixin, get_serializer_data,
+                      request_metrics)
+from .paginator import FeedPaginator, KeysetPaginator
+from .recipe_matcher import recipe_matcher
+from .response_cache import response_cache
+from .search import get_search_highlights
+from .shopping_list import (TXTRenderer, CSVRenderer, JSONListRenderer,
+                            PDFRenderer, STREAMS, build_pdf,
+                            get_shopping_list, get_shopping_list_etag)
+
+
+class IngredientViewSet(RequestMetricsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name', '')
+        if request.accepted_renderer.format != 'json':
+            return Response(ingredient_index.search(name))
+        return HttpResponse(ingredient_index.render(name),
+                            content_type='application/json')
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(RequestMetricsMixin, ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
@@ -40,18 +68,138 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve', 'match', 'feed']:
+            queryset = queryset.select_related('author').prefetch_related(
+                Prefetch(
+                    'recipeName',
+                    queryset=UsedIngredients.objects.select_related(
+                        'ingredient'
+                    ),
+                )
+            )
+        return queryset
+
+    @property
+    def cursor_ordering(self):
+        return RecipeFilter.orderings.get(
+            self.request.query_params.get('ordering'),
+            KeysetPaginator.ordering,
+        )
+
+    def get_validator_queryset(self):
+        return Recipe.objects.select_related('author').only(
+            'id', 'updated_at', 'author', 'author__updated_at'
+        )
+
+    def get_timestamps(self, recipe):
+        return [recipe.updated_at, recipe.author.updated_at]
+
+    def get_membership(self, recipes):
+        return MembershipResolver(
+            self.request.user,
+            [recipe.id for recipe in recipes],
+            [recipe.author_id for recipe in recipes],
+        )
+
+    extra_fields = None
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        user = self.request.user
-        if user.is_authenticated:
-            context['is_favorited_ids'] = set(
-                Favorite.objects.filter(user=user)
-                .values_list('recipe_id', flat=True)
-            )
-        else:
-            context['is_favorited_ids'] = set()
+        if self.extra_fields is not None:
+            context['extra_fields'] = self.extra_fields
         return context
 
+    def set_search_highlights(self, page):
+        query = self.request.query_params.get('search', '').strip()
+        if page is not None and query and self.action == 'list':
+            highlights = get_search_highlights(
+                [recipe.id for recipe in page], query
+            )
+            self.extra_fields = {
+                recipe.id: {'search_highlight': highlights.get(recipe.id)}
+                for recipe in page
+            }
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        self.set_search_highlights(page)
+        return page
+
+    def list(self, request, *args, **kwargs):
+        return response_cache.serve(
+            request, ['recipes'],
+            partial(self.conditional_list, request),
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[AllowAny],
+    )
+    def match(self, request):
+        params = RecipeMatchSerializer(data={
+            name: [
+                value
+                for values in request.query_params.getlist(name)
+                for value in values.split(',') if value
+            ]
+            for name in ('ingredients', 'exclude')
+        } | {
+            name: request.query_params[name]
+            for name in ('min_coverage',) if name in request.query_params
+        })
+        params.is_valid(raise_exception=True)
+        matches = recipe_matcher.match(
+            params.validated_data['ingredients'],
+            params.validated_data.get('exclude', ()),
+            params.validated_data['min_coverage'],
+        )
+        page = self.paginate_queryset(matches)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, _, recipe_id in page]
+        )
+        self.extra_fields = {
+            recipe_id: {
+                'coverage': round(coverage, 4),
+                'matched_ingredients': count,
+            }
+            for coverage, count, recipe_id in page
+        }
+        recipes = [recipes[recipe_id] for _, _, recipe_id in page
+                   if recipe_id in recipes]
+        self.membership = self.get_membership(recipes)
+        return self.get_paginated_response(
+            get_serializer_data(self.get_serializer(recipes, many=True))
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPaginator,
+    )
+    def feed(self, request):
+        page = self.paginate_queryset(
+            RecipeFeed(request.user, self.get_queryset())
+        )
+        self.membership = self.get_membership(page)
+        return self.get_paginated_response(
+            get_serializer_data(self.get_serializer(page, many=True))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(
+            request,
+            partial(
+                response_cache.serve,
+                request, [f'recipe:{kwargs["pk"]}', 'ingredients'],
+                partial(super().retrieve, request, *args, **kwargs),
+            ),
+            kwargs['pk'],
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -101,53 +249,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/bulk',
+        url_name='shopping_cart_bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        return self._handle_bulk_relation(request, ShoppingCart)
+
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
         url_path='download_shopping_cart',
-        url_name='download_shopping_cart'
+        url_name='download_shopping_cart',
+        renderer_classes=[TXTRenderer, CSVRenderer,
+                          JSONListRenderer, PDFRenderer],
     )
     def download_shopping_cart(self, request):
-        recipe_ids = ShoppingCart.objects.filter(
-            user=request.user
-        ).values_list('recipe_id', flat=True)
-
-        ingredients = (
-            UsedIngredients.objects.filter(recipe_id__in=recipe_ids)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(totalSum=Sum("amount"))
-        )
-
-        if not ingredients:
+        file_format = request.accepted_renderer.format
+        if not ShoppingCart.objects.filter(user=request.user).exists():
             return Response(
                 {"detail": "Ваша корзина пуста."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        txtContent = self.convertToTXT(ingredients)
-        return self.responseFromFile(txtContent, filename='shoppingCart.txt')
-
-    def convertToTXT(self, ingredients):
-        lines = []
-        for item in ingredients:
-            name = item['ingredient__name']
-            unit = item['ingredient__measurement_unit']
-            amount = item['totalSum']
-            line = f"{name} — {amount} ({unit})"
-            lines.append(line)
-        return "\n".join(lines)
-
-    def responseFromFile(self, text, filename):
-        tmp = tempfile.NamedTemporaryFile(mode='w+b',
-                                          delete=False, suffix='.txt')
-        tmp.write(text.encode('utf-8'))
-        tmp.flush()
-        tmp.seek(0)
-        return FileResponse(
-            tmp,
-            as_attachment=True,
-            filename=filename,
-            content_type='text/plain')
+        etag = get_shopping_list_etag(request.user, file_format)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        ingredients = get_shopping_list(request.user)
+        filename = f'shoppingCart.{file_format}'
+        content_type = request.accepted_renderer.media_type
+        if file_format == 'pdf':
+            response = HttpResponse(build_pdf(ingredients),
+                                    content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                STREAMS[file_format](ingredients),
+                content_type=f'{content_type}; charset=utf-8',
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     @action(
         detail=True,
@@ -161,6 +311,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def remove_favorite(self, request, pk=None):
         return self._handle_remove_relation(request, Favorite)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite/bulk',
+        url_name='favorite_bulk',
+    )
+    def favorite_bulk(self, request):
+        return self._handle_bulk_relation(request, Favorite)
+
     @action(
         detail=True,
         methods=("get",),
@@ -178,9 +338,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def _handle_add_relation(self, request, model):
         recipe = self.get_object()
         user = request.user
-        if model.objects.filter(user=user, recipe=recipe).exists():
+        try:
+            with transaction.atomic():
+                model.objects.create(user=user, recipe=recipe)
+        except IntegrityError:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        model.objects.create(user=user, recipe=recipe)
         return Response(
             CuttedRecipesSerializer(recipe).data,
             status=status.HTTP_201_CREATED,
@@ -195,16 +357,48 @@ class RecipeViewSet(viewsets.ModelViewSet):
         relation.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def _handle_bulk_relation(self, request, model):
+        serializer = BulkRelationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = apply_bulk_relation(
+                model, 'recipe_id', request.user, Recipe.objects.all(),
+                **serializer.validated_data,
+            )
+        return Response(results)
+
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(RequestMetricsMixin, ConditionalGetMixin,
+                  viewsets.ModelViewSet):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
+    cursor_ordering = ('id',)
 
     def get_serializer_class(self):
         if self.action == 'create':
             return UserRegisterSerializer
         return UserSerializer
 
+    def get_validator_queryset(self):
+        return User.objects.only('id', 'updated_at')
+
+    def get_timestamps(self, user):
+        return [user.updated_at]
+
+    def get_membership(self, users):
+        return MembershipResolver(
+            self.request.user, author_ids=[user.id for user in users]
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_list(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(
+            request, partial(super().retrieve, request, *args, **kwargs),
+            kwargs['pk'],
+        )
+
     def _get_follow_context(self, request):
         return {
             'request': request,
@@ -251,7 +445,7 @@ class UserViewSet(viewsets.ModelViewSet):
             request.user,
             context=self.get_serializer_context()
         )
-        return Response(serializer.data)
+        return Response(get_serializer_data(serializer))
 
     @action(
         detail=False,
@@ -292,6 +486,9 @@ class UserViewSet(viewsets.ModelViewSet):
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def get_subscriptions(self, user):
+        return User.objects.filter(follower__user=user)
+
     @action(
         detail=False,
         methods=['get'],
@@ -300,14 +497,35 @@ class UserViewSet(viewsets.ModelViewSet):
     def subscriptions(self, request):
         user = request.user
         recipes_limit = request.query_params.get('recipes_limit')
-        queryset = User.objects.filter(follower__user=user) \
-            .annotate(recipes_count=Count('recipe'))
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(self.get_subscriptions(user))
+        author_ids = [author.id for author in page]
         context = self.get_serializer_context()
         context['recipes_limit'] = recipes_limit
+        context['recipes_by_author'] = \
+            FollowSerializer.get_recipes_by_author(author_ids, recipes_limit)
+        context['membership'] = MembershipResolver(
+            user, author_ids=author_ids, subscribed_ids=author_ids
+        )
 
         serializer = FollowSerializer(page, many=True, context=context)
-        return self.get_paginated_response(serializer.data)
+        return self.get_paginated_response(get_serializer_data(serializer))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe/bulk',
+        url_name='subscribe_bulk',
+    )
+    def subscribe_bulk(self, request):
+        serializer = BulkRelationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = apply_bulk_relation(
+                Follow, 'follower_id', request.user, User.objects.all(),
+                forbidden={request.user.id}, **serializer.validated_data,
+            )
+        return Response(results)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, pk=None):
@@ -320,3 +538,20 @@ class UserViewSet(viewsets.ModelViewSet):
 
         follow.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            request_metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
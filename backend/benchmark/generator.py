@@ -0,0 +1,162 @@
+import io
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from api.response_cache import response_cache
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeRanking, RecipeSearchDocument,
+                            ShoppingCart, ShoppingListItem, UsedIngredients)
+from users.models import Follow, User
+
+USERNAME_PREFIX = 'benchmark_'
+PASSWORD = 'benchmark'
+IMAGE_NAME = 'recipes/benchmark.png'
+
+
+def get_benchmark_users():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX)
+
+
+class DataGenerator:
+
+    def __init__(self, users=100, recipes=10, ingredients=(3, 12),
+                 follows=20, favorites=20, carts=5, seed=0,
+                 batch_size=5000, log=None):
+        self.users = users
+        self.recipes = recipes
+        self.ingredients = ingredients
+        self.follows = follows
+        self.favorites = favorites
+        self.carts = carts
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def clear(self):
+        return get_benchmark_users().delete()[0]
+
+    def zipf_weights(self, count):
+        return [1 / (rank + 1) for rank in range(count)]
+
+    def pick(self, population, weights, count, exclude=None):
+        count = min(count, len(population) - (exclude is not None))
+        picked = set()
+        while len(picked) < count:
+            for item in self.random.choices(
+                population, weights, k=count - len(picked)
+            ):
+                if item != exclude:
+                    picked.add(item)
+        return picked
+
+    def save_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (480, 480), 'white').save(buffer, format='PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def step(self, name, started):
+        self.log(f'{name}: {time.perf_counter() - started:.1f} с')
+        return time.perf_counter()
+
+    def create_users(self):
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name='Бенчмарк', last_name=str(number),
+                password=password,
+            )
+            for number in range(self.users)
+        ], batch_size=self.batch_size)
+        Token.objects.bulk_create([
+            Token(user=user, key=Token.generate_key()) for user in users
+        ], batch_size=self.batch_size)
+        return [user.id for user in users]
+
+    def create_recipes(self, user_ids, image):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author_id=author_id, name=f'Рецепт {author_id}-{number}',
+                text='Смешать ингредиенты и готовить до готовности. ' * 5,
+                image=image, cooking_time=self.random.randint(5, 180),
+            )
+            for author_id in user_ids
+            for number in range(self.random.randint(0, 2 * self.recipes))
+        ], batch_size=self.batch_size)
+        return [recipe.id for recipe in recipes]
+
+    def create_ingredients(self, recipe_ids, ingredient_ids):
+        batch = []
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.random.sample(ingredient_ids, min(
+                len(ingredient_ids), self.random.randint(*self.ingredients)
+            )):
+                batch.append(UsedIngredients(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                ))
+            if len(batch) >= self.batch_size:
+                UsedIngredients.objects.bulk_create(batch)
+                batch = []
+        UsedIngredients.objects.bulk_create(batch)
+
+    def create_relations(self, model, field, user_ids, targets, count,
+                         exclude_self=False):
+        weights = self.zipf_weights(len(targets))
+        batch = []
+        for user_id in user_ids:
+            for target in self.pick(targets, weights, count,
+                                    user_id if exclude_self else None):
+                batch.append(model(user_id=user_id, **{field: target}))
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def generate(self):
+        if get_benchmark_users().exists():
+            raise ValueError('Данные для нагрузочного теста уже созданы.')
+        started = time.perf_counter()
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', verbosity=0)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        image = self.save_image()
+        with transaction.atomic():
+            user_ids = self.create_users()
+            started = self.step('пользователи', started)
+            recipe_ids = self.create_recipes(user_ids, image)
+            self.create_ingredients(recipe_ids, ingredient_ids)
+            started = self.step('рецепты', started)
+            self.create_relations(Follow, 'follower_id', user_ids,
+                                  user_ids, self.follows, exclude_self=True)
+            self.create_relations(Favorite, 'recipe_id', user_ids,
+                                  recipe_ids, self.favorites)
+            self.create_relations(ShoppingCart, 'recipe_id', user_ids,
+                                  recipe_ids, self.carts)
+            started = self.step('подписки, избранное и корзины', started)
+            call_command('reconcile_counters', verbosity=0)
+            ShoppingListItem.objects.rebuild(user_ids)
+            RecipeSearchDocument.objects.refresh(recipe_ids)
+            for start in range(0, len(recipe_ids), self.batch_size):
+                FeedEntry.objects.fan_out(
+                    recipe_ids[start:start + self.batch_size]
+                )
+            RecipeRanking.objects.rebuild()
+            self.step('счётчики, списки покупок, поиск, ленты и рейтинги',
+                      started)
+        response_cache.invalidate('recipes')
+        return {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'ingredients': len(ingredient_ids),
+        }
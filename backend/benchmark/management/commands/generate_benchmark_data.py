@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from benchmark.generator import DataGenerator
+
+
+class Command(BaseCommand):
+    help = ('Создаёт данные для нагрузочного теста: пользователей, '
+            'подписки, рецепты с ингредиентами, избранное и корзины. '
+            'Популярность авторов и рецептов распределена по закону Ципфа.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Количество пользователей.',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=10,
+            help='Среднее количество рецептов у пользователя.',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, nargs=2, default=[3, 12],
+            metavar=('MIN', 'MAX'),
+            help='Количество ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Количество подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Количество рецептов в избранном у пользователя.',
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Количество рецептов в корзине у пользователя.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные данные перед генерацией.',
+        )
+
+    def handle(self, *args, **options):
+        generator = DataGenerator(
+            users=options['users'], recipes=options['recipes'],
+            ingredients=options['ingredients'], follows=options['follows'],
+            favorites=options['favorites'], carts=options['carts'],
+            seed=options['seed'], log=self.stdout.write,
+        )
+        if options['clear']:
+            self.stdout.write(f'Удалено объектов: {generator.clear()}.')
+        try:
+            created = generator.generate()
+        except ValueError as error:
+            raise CommandError(f'{error} Используйте --clear.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {created["users"]}, '
+            f'рецептов: {created["recipes"]}, '
+            f'ингредиентов в справочнике: {created["ingredients"]}.'
+        ))
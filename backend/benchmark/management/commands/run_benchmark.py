@@ -0,0 +1,104 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from benchmark.mix import DEFAULT_PATH, load_mix
+from benchmark.runner import BenchmarkRunner, compare
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Воспроизводит сценарий запросов к API на данных '
+            'generate_benchmark_data и выводит req/s, p50/p95/p99 '
+            'и количество запросов к БД для каждого эндпоинта. '
+            'Все изменения откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mix', default=str(DEFAULT_PATH),
+            help='JSONL файл со сценарием запросов.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Количество измеряемых запросов.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=200,
+            help='Количество запросов для прогрева кешей.',
+        )
+        parser.add_argument(
+            '--mode', choices=['weighted', 'sequential'], default='weighted',
+            help='Выбор запросов по весам или по порядку из файла.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--output', help='Сохранить отчёт в JSON файл.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON отчёт предыдущего запуска для поиска регрессий.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно baseline.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            runner = BenchmarkRunner(
+                load_mix(options['mix']), mode=options['mode'],
+                seed=options['seed'], warmup=options['warmup'],
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root,
+                                      ALLOWED_HOSTS=['testserver'],
+                                      IMAGE_RENDITIONS={}), \
+                    transaction.atomic():
+                report = runner.run(options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+        except ValueError as error:
+            raise CommandError(error)
+        self.write_report(report)
+        for name, path, status in runner.failures[:10]:
+            self.stderr.write(f'{name}: {path} вернул {status}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = compare(report, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Обнаружены регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено.'))
+
+    def write_report(self, report):
+        self.stdout.write(
+            f'{"endpoint":<32} {"requests":>8} {"rps":>8} {"p50, ms":>8} '
+            f'{"p95, ms":>8} {"p99, ms":>8} {"queries":>7} {"max q":>5} '
+            f'{"errors":>6}'
+        )
+        rows = list(report['endpoints'].items()) + [('total',
+                                                     report['total'])]
+        for name, stats in rows:
+            self.stdout.write(
+                f'{name:<32} {stats["requests"]:>8} {stats["rps"]:>8.1f} '
+                f'{stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                f'{stats["p99_ms"]:>8.1f} {stats["queries"]:>7.1f} '
+                f'{stats["max_queries"]:>5} {stats["errors"]:>6}'
+            )
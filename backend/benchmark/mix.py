@@ -0,0 +1,93 @@
+import json
+import re
+from itertools import cycle, islice
+from pathlib import Path
+from string import Formatter
+from urllib.parse import quote
+
+DEFAULT_PATH = Path(__file__).resolve().parent / 'mix.jsonl'
+FIELDS = {'name', 'method', 'path', 'weight', 'auth', 'body', 'expect'}
+PLACEHOLDERS = {'recipe', 'user', 'author', 'page', 'ingredient_prefix',
+                'query', 'ingredients', 'recipe_ingredients', 'image'}
+PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+
+def get_placeholders(value):
+    if isinstance(value, dict):
+        return set().union(*map(get_placeholders, value.values()))
+    if isinstance(value, list):
+        return set().union(*map(get_placeholders, value))
+    if isinstance(value, str):
+        return {name for _, name, _, _ in Formatter().parse(value) if name}
+    return set()
+
+
+def render_body(value, values):
+    if isinstance(value, dict):
+        return {key: render_body(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render_body(item, values) for item in value]
+    if isinstance(value, str):
+        match = PLACEHOLDER.match(value)
+        if match:
+            return values[match[1]]
+        return value.format_map(values)
+    return value
+
+
+def render_path(path, values):
+    return path.format_map({
+        name: quote(str(value), safe=',') for name, value in values.items()
+    })
+
+
+def parse_entry(entry, location):
+    if not isinstance(entry, dict) or 'path' not in entry:
+        raise ValueError(f'{location}: ожидался объект с полем path.')
+    unknown = set(entry) - FIELDS
+    if unknown:
+        raise ValueError(
+            f'{location}: неизвестные поля {", ".join(sorted(unknown))}.'
+        )
+    unknown = get_placeholders([entry['path'], entry.get('body')]) \
+        - PLACEHOLDERS
+    if unknown:
+        raise ValueError(f'{location}: неизвестные подстановки '
+                         f'{", ".join(sorted(unknown))}.')
+    method = entry.get('method', 'GET').upper()
+    expect = entry.get('expect', 200)
+    return {
+        'name': entry.get('name') or f'{method} {entry["path"]}',
+        'method': method,
+        'path': entry['path'],
+        'weight': float(entry.get('weight', 1)),
+        'auth': bool(entry.get('auth', False)),
+        'body': entry.get('body'),
+        'expect': set(expect if isinstance(expect, list) else [expect]),
+    }
+
+
+def load_mix(path=DEFAULT_PATH):
+    entries = []
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'{path}:{number}: некорректный JSON '
+                                 f'({error}).')
+            entries.append(parse_entry(entry, f'{path}:{number}'))
+    if not entries:
+        raise ValueError(f'{path}: сценарий не содержит запросов.')
+    return entries
+
+
+def iterate_mix(entries, count, mode='weighted', random=None):
+    if mode == 'sequential':
+        return islice(cycle(entries), count)
+    return iter(random.choices(
+        entries, [entry['weight'] for entry in entries], k=count
+    ))
@@ -0,0 +1,174 @@
+import base64
+import io
+import json
+import random
+import time
+from collections import defaultdict
+from itertools import accumulate
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+from api.metrics import percentile
+from recipes.models import Ingredient, Recipe
+from .generator import USERNAME_PREFIX, get_benchmark_users
+from .mix import iterate_mix, render_body, render_path
+
+
+def summarize(latencies, queries, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / max(sum(latencies), 1e-9), 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries': round(sum(queries) / max(len(queries), 1), 2),
+        'max_queries': max(queries, default=0),
+        'errors': errors,
+    }
+
+
+class BenchmarkRunner:
+
+    def __init__(self, entries, mode='weighted', seed=0, warmup=0):
+        self.entries = entries
+        self.mode = mode
+        self.random = random.Random(seed)
+        self.warmup = warmup
+        self.client = APIClient()
+        self.failures = []
+
+    def load_fixtures(self):
+        self.users = list(
+            get_benchmark_users().filter(auth_token__isnull=False)
+            .order_by('id').values_list('id', 'auth_token__key')
+        )
+        if len(self.users) < 2:
+            raise ValueError('Нет данных для нагрузочного теста, '
+                             'выполните generate_benchmark_data.')
+        self.recipe_ids = list(
+            Recipe.objects.filter(author__username__startswith=USERNAME_PREFIX)
+            .order_by('-favorites_count', 'id').values_list('id', flat=True)
+        )
+        self.ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', 'name')
+        )
+        if not self.recipe_ids or not self.ingredients:
+            raise ValueError('Нет рецептов или ингредиентов для '
+                             'нагрузочного теста.')
+        self.recipe_weights = list(accumulate(
+            1 / (rank + 1) for rank in range(len(self.recipe_ids))
+        ))
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, format='PNG')
+        self.image = 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+
+    def get_values(self, user_id):
+        ingredients = self.random.sample(
+            self.ingredients, min(3, len(self.ingredients))
+        )
+        name = self.random.choice(self.ingredients)[1]
+        author_id = self.random.choice(self.users)[0]
+        while author_id == user_id:
+            author_id = self.random.choice(self.users)[0]
+        return {
+            'recipe': self.random.choices(
+                self.recipe_ids, cum_weights=self.recipe_weights
+            )[0],
+            'user': user_id,
+            'author': author_id,
+            'page': self.random.randint(1, 5),
+            'ingredient_prefix': name[:self.random.randint(1, 3)],
+            'query': name.split()[0],
+            'ingredients': ','.join(
+                str(ingredient_id) for ingredient_id, _ in ingredients
+            ),
+            'recipe_ingredients': [
+                {'id': ingredient_id, 'amount': self.random.randint(1, 500)}
+                for ingredient_id, _ in ingredients
+            ],
+            'image': self.image,
+        }
+
+    def send(self, entry):
+        user_id, key = self.random.choice(self.users)
+        values = self.get_values(user_id)
+        if entry['auth']:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        else:
+            self.client.credentials()
+        body = entry['body']
+        if body is not None:
+            body = json.dumps(render_body(body, values))
+        path = render_path(entry['path'], values)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            with TestCase.captureOnCommitCallbacks(execute=True):
+                response = self.client.generic(
+                    entry['method'], path, body or '',
+                    content_type='application/json',
+                )
+            elapsed = time.perf_counter() - started
+        if response.status_code not in entry['expect']:
+            self.failures.append((entry['name'], path, response.status_code))
+            return elapsed, len(context.captured_queries), False
+        return elapsed, len(context.captured_queries), True
+
+    def run(self, count):
+        self.load_fixtures()
+        for entry in iterate_mix(self.entries, self.warmup, self.mode,
+                                 self.random):
+            self.send(entry)
+        self.failures = []
+        latencies, queries = defaultdict(list), defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        for entry in iterate_mix(self.entries, count, self.mode,
+                                 self.random):
+            elapsed, captured, succeeded = self.send(entry)
+            latencies[entry['name']].append(elapsed)
+            queries[entry['name']].append(captured)
+            errors[entry['name']] += not succeeded
+        elapsed = time.perf_counter() - started
+        total = summarize(
+            [value for values in latencies.values() for value in values],
+            [value for values in queries.values() for value in values],
+            sum(errors.values()),
+        )
+        total['rps'] = round(total['requests'] / max(elapsed, 1e-9), 1)
+        return {
+            'elapsed': round(elapsed, 3),
+            'total': total,
+            'endpoints': {
+                name: summarize(latencies[name], queries[name], errors[name])
+                for name in sorted(latencies)
+            },
+        }
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for name, stats in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        if stats['max_queries'] > before['max_queries']:
+            regressions.append(
+                f'{name}: запросов к БД {stats["max_queries"]} '
+                f'(было {before["max_queries"]})'
+            )
+        if stats['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {stats["p95_ms"]} мс '
+                f'(было {before["p95_ms"]} мс)'
+            )
+        if stats['errors'] > before['errors']:
+            regressions.append(
+                f'{name}: ошибок {stats["errors"]} (было {before["errors"]})'
+            )
+    return regressions
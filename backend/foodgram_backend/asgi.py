@@ -7,10 +7,41 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
 
-application = get_asgi_application()
+
+class ConcurrencyLimit:
+
+    def __init__(self, application, limit):
+        self.application = application
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        await self.semaphore.acquire()
+        acquired = True
+
+        async def send_response(message):
+            nonlocal acquired
+            if acquired and message['type'] == 'http.response.start':
+                acquired = False
+                self.semaphore.release()
+            await send(message)
+
+        try:
+            return await self.application(scope, receive, send_response)
+        finally:
+            if acquired:
+                self.semaphore.release()
+
+
+application = ConcurrencyLimit(
+    get_asgi_application(), settings.ASGI_MAX_CONCURRENT_REQUESTS
+)
@@ -45,9 +45,11 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'benchmark.apps.BenchmarkConfig',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,6 +96,80 @@ DATABASES = {
     }
 }
 
+# Run with more than one worker process only with a shared default cache
+# (CACHE_BACKEND and CACHE_LOCATION pointing to Redis or Memcached):
+# processes learn about changes made by others through versions stored
+# there, a local memory cache leaves them serving stale data. Shared state:
+# - the ingredient search index version;
+# - the recipe matcher change sequence and change log;
+# - the response cache tag versions.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    },
+    # Users resolved from auth tokens, kept apart from the default cache so
+    # that cached responses do not evict them. Entries are dropped when the
+    # user is saved (password, is_active, profile), on logout and deletion.
+    'auth_tokens': {
+        'BACKEND': os.getenv('CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('AUTH_TOKEN_CACHE_LOCATION',
+                              os.getenv('CACHE_LOCATION', 'auth_tokens')),
+        'KEY_PREFIX': 'auth_tokens',
+        'TIMEOUT': int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+    },
+}
+if CACHES['auth_tokens']['BACKEND'].endswith('LocMemCache'):
+    CACHES['auth_tokens']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000)),
+    }
+
+# Serve recipe list/detail, ingredient search and short links with async
+# views. Requires the ASGI application (foodgram_backend.asgi) and drops
+# the sync-only WhiteNoise middleware: static files are served by nginx.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+if ASYNC_READ_VIEWS:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+# Requests processed at once by one ASGI worker; Django runs sync code of
+# every in-flight request in its own thread, the rest wait in the loop.
+ASGI_MAX_CONCURRENT_REQUESTS = int(
+    os.getenv('ASGI_MAX_CONCURRENT_REQUESTS', 16)
+)
+
+# Lifetime in seconds of cached anonymous recipe responses.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Authors with more followers are not fanned out into follower timelines,
+# their recipes are merged into feeds at read time.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+# Latest recipes copied into a timeline when the user subscribes.
+FEED_BACKFILL_RECIPES = 100
+
+# Weights of favorite and shopping cart additions in recipe rankings and
+# the half-life in seconds of an addition in the trending ranking. After
+# changing them run refresh_recipe_rankings --rebuild.
+RECIPE_RANKING_WEIGHTS = {'favorite': 1.0, 'cart': 0.5}
+RECIPE_TRENDING_HALF_LIFE = 24 * 60 * 60
+
+# Per-view request metrics exported at /api/metrics/ in Prometheus format.
+# A warning is logged when a request executes more SQL queries than the
+# threshold of its view ('<View>.<action>'), '*' applies to all others.
+REQUEST_METRICS_QUERY_THRESHOLDS = {
+    '*': 30,
+    'RecipeViewSet.list': 10,
+    'RecipeViewSet.retrieve': 10,
+    'RecipeViewSet.feed': 10,
+    'UserViewSet.subscriptions': 10,
+}
+REQUEST_METRICS_SERVER_TIMING = True
+# Seconds between flushes of per-process counters to the cache. Totals are
+# aggregated in the default cache, so with several worker processes it must
+# be shared (CACHE_BACKEND/CACHE_LOCATION), otherwise each worker exports
+# only its own counters.
+REQUEST_METRICS_FLUSH_INTERVAL = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,6 +213,26 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Limits for base64 image uploads, checked before the image is decoded.
+IMAGE_UPLOAD_MAX_BYTES = 8 * 1024 * 1024
+IMAGE_UPLOAD_MAX_SIDE = 8000
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Resized copies generated in the background for uploaded images:
+# {kind: {rendition name: (max width, max height)}}.
+IMAGE_RENDITIONS = {
+    'recipe': {
+        'card': (480, 480),
+        'detail': (1200, 1200),
+    },
+    'avatar': {
+        'avatar': (160, 160),
+    },
+}
+IMAGE_RENDITION_WORKERS = 2
+IMAGE_RENDITIONS_ASYNC = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -148,7 +244,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'api.paginator.NumPagesPaginator',
@@ -157,6 +253,13 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
 
+# Maximum number of ingredients returned by the name prefix search,
+# None means no limit.
+INGREDIENT_SEARCH_LIMIT = None
+
+# TrueType font with Cyrillic glyphs used for the PDF shopping list.
+SHOPPING_LIST_PDF_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
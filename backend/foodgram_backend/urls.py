@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from api.views import RecipeViewSet
@@ -7,3 +8,8 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path("s/<int:pk>/", RecipeViewSet.as_view({"get": "retrieve"})),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from api.async_views import RecipeDetailView
+
+    urlpatterns[-1] = path("s/<int:pk>/", RecipeDetailView.as_view())
@@ -1,6 +1,6 @@
 from django.contrib import admin
-from .models import Recipe, Ingredient, UsedIngredients, Favorite, ShoppingCart
-from django.db.models import Count
+from .models import (Recipe, Ingredient, UsedIngredients, Favorite,
+                     ShoppingCart, ShoppingListItem)
 
 
 class InlineModelUsedIngredients(admin.TabularInline):
@@ -13,7 +13,8 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'favorites_count'
+        'favorites_count',
+        'in_carts_count',
     )
     search_fields = (
         'name',
@@ -22,14 +23,6 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     inlines = [InlineModelUsedIngredients]
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(fav_count=Count('favorite'))
-
-    @admin.display(description='Добавлений в избранное')
-    def favorites_count(self, obj):
-        return obj.fav_count
-
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -52,3 +45,9 @@ class FavoriteAdmin(admin.ModelAdmin):
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'ingredient', 'total_amount')
+    search_fields = ('user__username', 'ingredient__name')
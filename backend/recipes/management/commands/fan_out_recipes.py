@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from recipes.models import FeedEntry, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Рассылает в ленты подписчиков рецепты, которые ещё не '
+            'разосланы (например, опубликованные до появления лент).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество рецептов, обрабатываемых за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.filter(fanned_out=False)
+            .values_list('id', flat=True)
+        )
+        created = 0
+        for start in range(0, len(recipe_ids), options['batch_size']):
+            created += FeedEntry.objects.fan_out(
+                recipe_ids[start:start + options['batch_size']]
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено записей в ленты: {created}.'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from recipes.models import RecipeSearchDocument
+
+
+class Command(BaseCommand):
+    help = 'Обновляет поисковые документы рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe', type=int, action='append', dest='recipe_ids',
+            help='Обновить только рецепт с данным id.',
+        )
+
+    def handle(self, *args, **options):
+        refreshed = RecipeSearchDocument.objects.refresh(
+            options['recipe_ids']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено поисковых документов: {refreshed}.'
+        ))
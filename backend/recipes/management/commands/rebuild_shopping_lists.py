@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок по текущему содержимому корзин.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Пересчитать только для пользователя с данным id.',
+        )
+
+    def handle(self, *args, **options):
+        created = ShoppingListItem.objects.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Позиций в списках покупок: {created}.'
+        ))
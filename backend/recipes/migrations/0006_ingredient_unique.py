@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    UsedIngredients = apps.get_model('recipes', 'UsedIngredients')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        extra_ids = list(
+            Ingredient.objects.filter(
+                name=row['name'], measurement_unit=row['measurement_unit']
+            ).exclude(id=row['keep_id']).values_list('id', flat=True)
+        )
+        for extra_id in extra_ids:
+            UsedIngredients.objects.filter(
+                ingredient_id=extra_id,
+                recipe__recipeName__ingredient_id=row['keep_id'],
+            ).delete()
+            UsedIngredients.objects.filter(ingredient_id=extra_id).update(
+                ingredient_id=row['keep_id']
+            )
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_relation_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
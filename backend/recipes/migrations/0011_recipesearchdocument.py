@@ -0,0 +1,113 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:37
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+POSTGRESQL_SEARCH = [
+    """
+    ALTER TABLE recipes_recipesearchdocument
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(ingredients, '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipesearchdocument USING GIN (search_vector)
+    """,
+]
+
+SQLITE_SEARCH = [
+    """
+    CREATE VIRTUAL TABLE recipes_recipesearch_fts USING fts5(
+        name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_fts_insert
+    AFTER INSERT ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts (rowid, name, text, ingredients)
+        VALUES (new.recipe_id, new.name, new.text, new.ingredients);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_fts_update
+    AFTER UPDATE ON recipes_recipesearchdocument BEGIN
+        DELETE FROM recipes_recipesearch_fts WHERE rowid = old.recipe_id;
+        INSERT INTO recipes_recipesearch_fts (rowid, name, text, ingredients)
+        VALUES (new.recipe_id, new.name, new.text, new.ingredients);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_fts_delete
+    AFTER DELETE ON recipes_recipesearchdocument BEGIN
+        DELETE FROM recipes_recipesearch_fts WHERE rowid = old.recipe_id;
+    END
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRESQL_SEARCH,
+        'sqlite': SQLITE_SEARCH,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_recipesearch_fts')
+
+
+def fill_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    UsedIngredients = apps.get_model('recipes', 'UsedIngredients')
+    RecipeSearchDocument = apps.get_model('recipes', 'RecipeSearchDocument')
+    ingredients = defaultdict(list)
+    for recipe_id, name in UsedIngredients.objects.values_list(
+        'recipe_id', 'ingredient__name'
+    ).iterator():
+        ingredients[recipe_id].append(name)
+    RecipeSearchDocument.objects.bulk_create(
+        [
+            RecipeSearchDocument(
+                recipe_id=recipe_id, name=name, text=text,
+                ingredients=' '.join(ingredients[recipe_id]),
+            )
+            for recipe_id, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text'
+            ).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('name', models.CharField(max_length=256, verbose_name='Название')),
+                ('text', models.TextField(verbose_name='Описание')),
+                ('ingredients', models.TextField(blank=True, verbose_name='Ингредиенты')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ рецепта',
+                'verbose_name_plural': 'Поисковые документы рецептов',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents,
+                             migrations.RunPython.noop),
+    ]
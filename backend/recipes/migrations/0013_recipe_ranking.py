@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:25
+
+import math
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_rankings(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRanking = apps.get_model('recipes', 'RecipeRanking')
+    weights = getattr(settings, 'RECIPE_RANKING_WEIGHTS',
+                      {'favorite': 1.0, 'cart': 0.5})
+    exponent = django.utils.timezone.now().timestamp() / getattr(
+        settings, 'RECIPE_TRENDING_HALF_LIFE', 24 * 60 * 60
+    )
+    batch = []
+    for recipe_id, favorites, carts in Recipe.objects.values_list(
+        'id', 'favorites_count', 'in_carts_count'
+    ).iterator(chunk_size=5000):
+        score = weights['favorite'] * favorites + weights['cart'] * carts
+        batch.append(RecipeRanking(
+            recipe_id=recipe_id, popular_score=score,
+            trending_score=exponent + math.log2(score) if score > 0 else 0,
+        ))
+        if len(batch) >= 5000:
+            RecipeRanking.objects.bulk_create(batch)
+            batch = []
+    RecipeRanking.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular_score', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending_score', models.FloatField(default=0, verbose_name='Популярность с затуханием (log2)')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+                'indexes': [models.Index(fields=['-popular_score', '-recipe'], name='recipe_ranking_popular_idx'), models.Index(fields=['-trending_score', '-recipe'], name='recipe_ranking_trending_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeRankingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('favorite', 'Избранное'), ('cart', 'Корзина')], max_length=16, verbose_name='Тип события')),
+                ('delta', models.SmallIntegerField(verbose_name='Изменение')),
+                ('happened_at', models.DateTimeField(verbose_name='Время события')),
+                ('recipe', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Событие рейтинга рецепта',
+                'verbose_name_plural': 'События рейтинга рецептов',
+            },
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
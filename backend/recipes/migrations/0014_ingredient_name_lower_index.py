@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+def create_name_lower_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_lower_idx '
+        'ON recipes_ingredient (LOWER(name))'
+    )
+
+
+def drop_name_lower_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_lower_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_ranking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_lower_index,
+                             drop_name_lower_index),
+    ]
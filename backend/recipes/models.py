@@ -1,6 +1,11 @@
-from django.db import models
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.core.validators import MinValueValidator
-from users.models import User
+from users.models import CounterFieldsMixin, Follow, User
 
 
 class Ingredient(models.Model):
@@ -11,12 +16,16 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиент'
+        constraints = [
+            models.UniqueConstraint(fields=('name', 'measurement_unit'),
+                                    name='unique_ingredient'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes',
         related_query_name='recipe', verbose_name='Автор рецепта')
@@ -29,10 +38,35 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(Ingredient,
                                          through='UsedIngredients',
                                          verbose_name='Список ингредиентов')
+    pub_date = models.DateTimeField(auto_now_add=True,
+                                    verbose_name='Дата публикации')
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='Дата изменения')
+    image_renditions = models.JSONField(default=dict, blank=True,
+                                        editable=False,
+                                        verbose_name='Превью картинки')
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Добавлений в избранное')
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Добавлений в корзину')
+    fanned_out = models.BooleanField(
+        default=False, editable=False, verbose_name='Разослан в ленты')
+
+    counter_fields = ('favorites_count', 'in_carts_count', 'fanned_out')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=('pub_date', 'id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=('pub_date', 'id'),
+                         condition=models.Q(fanned_out=False),
+                         name='recipe_pulled_feed_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -64,10 +98,16 @@ class Favorite(models.Model):
         User, on_delete=models.CASCADE, related_name='favorites',
         verbose_name='Пользователь'
     )
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name='Дата добавления')
 
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe'),
+                                    name='unique_favorite'),
+        ]
 
 
 class UserToRecipe(models.Model):
@@ -96,7 +136,446 @@ class ShoppingCart(UserToRecipe):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
                                related_name='shoppingcart',
                                verbose_name='Рецепт')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name='Дата добавления')
 
     class Meta():
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe'),
+                                    name='unique_shopping_cart'),
+        ]
+
+
+class ShoppingListItemManager(models.Manager):
+
+    def touch(self, user_ids=None):
+        users = User.objects.all()
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+        users.update(shopping_list_version=F('shopping_list_version') + 1)
+
+    def touch_ingredient(self, ingredient_id):
+        self.touch(self.filter(ingredient_id=ingredient_id).values('user_id'))
+
+    def apply_deltas(self, deltas):
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not deltas:
+            return
+        user_ids = {user_id for user_id, _ in deltas}
+        ingredient_ids = {ingredient_id for _, ingredient_id in deltas}
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                id__in=user_ids
+            ).order_by('id').values_list('id', flat=True))
+            existing = {
+                (item.user_id, item.ingredient_id): item
+                for item in self.filter(
+                    user_id__in=user_ids, ingredient_id__in=ingredient_ids
+                )
+            }
+            to_create, to_update, to_delete = [], [], []
+            for key, delta in deltas.items():
+                item = existing.get(key)
+                if item is None:
+                    if delta > 0:
+                        to_create.append(self.model(
+                            user_id=key[0], ingredient_id=key[1],
+                            total_amount=delta,
+                        ))
+                    continue
+                item.total_amount += delta
+                if item.total_amount > 0:
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.id)
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ['total_amount'])
+            self.filter(id__in=to_delete).delete()
+            self.touch(user_ids)
+
+    def apply_recipe(self, user_ids, recipe_id, sign):
+        amounts = UsedIngredients.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount')
+        self.apply_deltas({
+            (user_id, ingredient_id): sign * amount
+            for ingredient_id, amount in amounts
+            for user_id in user_ids
+        })
+
+    def apply_recipes(self, user_id, added_ids=(), removed_ids=()):
+        signs = dict.fromkeys(added_ids, 1) | dict.fromkeys(removed_ids, -1)
+        deltas = defaultdict(int)
+        for recipe_id, ingredient_id, amount in UsedIngredients.objects.filter(
+            recipe_id__in=signs
+        ).values_list('recipe_id', 'ingredient_id', 'amount'):
+            deltas[(user_id, ingredient_id)] += signs[recipe_id] * amount
+        self.apply_deltas(deltas)
+
+    def apply_recipe_change(self, recipe_id, old_amounts, new_amounts):
+        changes = defaultdict(int)
+        for ingredient_id, amount in new_amounts.items():
+            changes[ingredient_id] += amount
+        for ingredient_id, amount in old_amounts.items():
+            changes[ingredient_id] -= amount
+        changes = {key: value for key, value in changes.items() if value}
+        if not changes:
+            return
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+        self.apply_deltas({
+            (user_id, ingredient_id): delta
+            for user_id in user_ids
+            for ingredient_id, delta in changes.items()
+        })
+
+    def rebuild(self, user_ids=None, batch_size=5000):
+        carts = ShoppingCart.objects.all()
+        items = self.all()
+        if user_ids is not None:
+            carts = carts.filter(user_id__in=user_ids)
+            items = items.filter(user_id__in=user_ids)
+        rows = (
+            carts.values('user_id')
+            .annotate(ingredient_id=F('recipe__recipeName__ingredient_id'))
+            .values('user_id', 'ingredient_id')
+            .annotate(total=Sum('recipe__recipeName__amount'))
+            .order_by()
+        )
+        created = 0
+        with transaction.atomic():
+            items.delete()
+            batch = []
+            for row in rows.iterator():
+                if row['ingredient_id'] is None:
+                    continue
+                batch.append(self.model(
+                    user_id=row['user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    total_amount=row['total'],
+                ))
+                if len(batch) >= batch_size:
+                    created += len(self.bulk_create(batch))
+                    batch = []
+            created += len(self.bulk_create(batch))
+            self.touch(user_ids)
+        return created
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shoppingListItems', verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        related_name='shoppingListItems', verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'ingredient'),
+                                    name='unique_shopping_list_item'),
+        ]
+
+
+class RecipeSearchDocumentManager(models.Manager):
+
+    def refresh(self, recipe_ids=None, batch_size=1000):
+        recipes = Recipe.objects.only('id', 'name', 'text').order_by('id')
+        if recipe_ids is not None:
+            recipes = recipes.filter(id__in=recipe_ids)
+        recipes = recipes.prefetch_related(models.Prefetch(
+            'ingredients', queryset=Ingredient.objects.only('id', 'name')
+        ))
+        refreshed, batch = 0, []
+        for recipe in recipes.iterator(chunk_size=batch_size):
+            batch.append(self.model(
+                recipe=recipe, name=recipe.name, text=recipe.text,
+                ingredients=' '.join(
+                    ingredient.name for ingredient in recipe.ingredients.all()
+                ),
+            ))
+            if len(batch) >= batch_size:
+                refreshed += len(self.upsert(batch))
+                batch = []
+        refreshed += len(self.upsert(batch))
+        return refreshed
+
+    def upsert(self, documents):
+        return self.bulk_create(
+            documents, update_conflicts=True, unique_fields=['recipe'],
+            update_fields=['name', 'text', 'ingredients'],
+        )
+
+
+class RecipeSearchDocument(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='search_document', verbose_name='Рецепт'
+    )
+    name = models.CharField(max_length=256, verbose_name='Название')
+    text = models.TextField(verbose_name='Описание')
+    ingredients = models.TextField(blank=True, verbose_name='Ингредиенты')
+
+    objects = RecipeSearchDocumentManager()
+
+    class Meta:
+        verbose_name = 'Поисковый документ рецепта'
+        verbose_name_plural = 'Поисковые документы рецептов'
+
+
+class FeedEntryManager(models.Manager):
+
+    @property
+    def max_followers(self):
+        return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)
+
+    @property
+    def backfill_size(self):
+        return getattr(settings, 'FEED_BACKFILL_RECIPES', 100)
+
+    def fan_out(self, recipe_ids, batch_size=1000):
+        recipes = Recipe.objects.filter(
+            id__in=recipe_ids, fanned_out=False,
+            author__followers_count__lte=self.max_followers,
+        ).values_list('id', 'author_id', 'pub_date')
+        created = 0
+        with transaction.atomic():
+            fanned_out = []
+            for recipe_id, author_id, pub_date in recipes:
+                batch = []
+                for user_id in Follow.objects.filter(
+                    follower_id=author_id
+                ).values_list('user_id', flat=True).iterator(batch_size):
+                    batch.append(self.model(
+                        user_id=user_id, recipe_id=recipe_id,
+                        author_id=author_id, pub_date=pub_date,
+                    ))
+                    if len(batch) >= batch_size:
+                        created += len(self.bulk_create(
+                            batch, ignore_conflicts=True
+                        ))
+                        batch = []
+                created += len(self.bulk_create(batch, ignore_conflicts=True))
+                fanned_out.append(recipe_id)
+            Recipe.objects.filter(id__in=fanned_out).update(fanned_out=True)
+        return created
+
+    def follow(self, user_id, author_ids):
+        if not author_ids:
+            return
+        recipes = Recipe.objects.filter(
+            author_id__in=author_ids, fanned_out=True
+        ).order_by('-pub_date', '-id').values_list(
+            'id', 'author_id', 'pub_date'
+        )[:self.backfill_size]
+        self.bulk_create([
+            self.model(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, pub_date=pub_date)
+            for recipe_id, author_id, pub_date in recipes
+        ], ignore_conflicts=True)
+
+    def unfollow(self, user_id, author_ids):
+        if author_ids:
+            self.filter(user_id=user_id, author_id__in=author_ids).delete()
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed_entries', verbose_name='Читатель'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='feed_entries', verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Автор рецепта'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = FeedEntryManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe'),
+                                    name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=('user', 'pub_date', 'recipe'),
+                         name='feed_entry_timeline_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_entry_author_idx'),
+        ]
+
+
+def add_decayed(score, terms):
+    exponents = [exponent for _, exponent in terms]
+    if score:
+        exponents.append(score)
+    if not exponents:
+        return score
+    top = max(exponents)
+    total = (2 ** (score - top) if score else 0) + sum(
+        weight * 2 ** (exponent - top) for weight, exponent in terms
+    )
+    if total <= 1e-9:
+        return 0.0
+    return top + math.log2(total)
+
+
+class RecipeRankingEventManager(models.Manager):
+
+    def record(self, kind, delta, rows):
+        return self.bulk_create([
+            self.model(recipe_id=recipe_id, kind=kind, delta=delta,
+                       happened_at=happened_at)
+            for recipe_id, happened_at in rows
+        ])
+
+
+class RecipeRankingEvent(models.Model):
+    FAVORITE, CART = 'favorite', 'cart'
+    KINDS = ((FAVORITE, 'Избранное'), (CART, 'Корзина'))
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name='Рецепт'
+    )
+    kind = models.CharField(max_length=16, choices=KINDS,
+                            verbose_name='Тип события')
+    delta = models.SmallIntegerField(verbose_name='Изменение')
+    happened_at = models.DateTimeField(verbose_name='Время события')
+
+    objects = RecipeRankingEventManager()
+
+    class Meta:
+        verbose_name = 'Событие рейтинга рецепта'
+        verbose_name_plural = 'События рейтинга рецептов'
+
+
+class RecipeRankingManager(models.Manager):
+
+    @property
+    def weights(self):
+        return getattr(settings, 'RECIPE_RANKING_WEIGHTS',
+                       {'favorite': 1.0, 'cart': 0.5})
+
+    @property
+    def half_life(self):
+        return getattr(settings, 'RECIPE_TRENDING_HALF_LIFE', 24 * 60 * 60)
+
+    def apply(self, events):
+        terms = defaultdict(list)
+        for recipe_id, kind, delta, happened_at in events:
+            terms[recipe_id].append((
+                self.weights.get(kind, 0) * delta,
+                happened_at.timestamp() / self.half_life,
+            ))
+        rankings = self.select_for_update().in_bulk(list(terms))
+        batch = []
+        for recipe_id in Recipe.objects.filter(
+            id__in=list(terms)
+        ).values_list('id', flat=True):
+            ranking = rankings.get(recipe_id) or self.model(
+                recipe_id=recipe_id
+            )
+            ranking.popular_score += sum(
+                weight for weight, _ in terms[recipe_id]
+            )
+            ranking.trending_score = add_decayed(
+                ranking.trending_score, terms[recipe_id]
+            )
+            batch.append(ranking)
+        return len(self.bulk_create(
+            batch, update_conflicts=True, unique_fields=['recipe'],
+            update_fields=['popular_score', 'trending_score'],
+        ))
+
+    def add_missing(self, batch_size=5000):
+        return len(self.bulk_create([
+            self.model(recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                ranking__isnull=True
+            ).values_list('id', flat=True)
+        ], batch_size=batch_size, ignore_conflicts=True))
+
+    def refresh(self, batch_size=10000):
+        processed = 0
+        while True:
+            with transaction.atomic():
+                events = list(
+                    RecipeRankingEvent.objects.select_for_update()
+                    .order_by('id')
+                    .values_list('id', 'recipe_id', 'kind', 'delta',
+                                 'happened_at')[:batch_size]
+                )
+                self.apply(event[1:] for event in events)
+                RecipeRankingEvent.objects.filter(
+                    id__in=[event[0] for event in events]
+                ).delete()
+            processed += len(events)
+            if len(events) < batch_size:
+                break
+        self.add_missing()
+        return processed
+
+    def rebuild(self, batch_size=10000):
+        with transaction.atomic():
+            last_event = RecipeRankingEvent.objects.order_by('-id').first()
+            self.add_missing()
+            self.update(popular_score=0, trending_score=0)
+            for kind, model in ((RecipeRankingEvent.FAVORITE, Favorite),
+                                (RecipeRankingEvent.CART, ShoppingCart)):
+                events = []
+                for recipe_id, created_at in model.objects.values_list(
+                    'recipe_id', 'created_at'
+                ).iterator(chunk_size=batch_size):
+                    events.append((recipe_id, kind, 1, created_at))
+                    if len(events) >= batch_size:
+                        self.apply(events)
+                        events = []
+                self.apply(events)
+            if last_event is not None:
+                RecipeRankingEvent.objects.filter(
+                    id__lte=last_event.id
+                ).delete()
+        return self.count()
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='ranking', verbose_name='Рецепт'
+    )
+    popular_score = models.FloatField(default=0,
+                                      verbose_name='Популярность')
+    trending_score = models.FloatField(
+        default=0, verbose_name='Популярность с затуханием (log2)'
+    )
+
+    objects = RecipeRankingManager()
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(fields=('-popular_score', '-recipe'),
+                         name='recipe_ranking_popular_idx'),
+            models.Index(fields=('-trending_score', '-recipe'),
+                         name='recipe_ranking_trending_idx'),
+        ]
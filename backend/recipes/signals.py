@@ -0,0 +1,173 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from users.models import Follow, User
+from .models import (FeedEntry, Favorite, Ingredient, Recipe,
+                     RecipeRanking, RecipeRankingEvent, RecipeSearchDocument,
+                     ShoppingCart, ShoppingListItem, UsedIngredients)
+
+
+RANKING_KINDS = {
+    Favorite: RecipeRankingEvent.FAVORITE,
+    ShoppingCart: RecipeRankingEvent.CART,
+}
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_counters(model, pks, field, delta):
+    if not pks:
+        return
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_counter(model, pk, field, delta):
+    change_counters(model, [pk], field, delta)
+
+
+def get_targets(model, relations):
+    targets = defaultdict(list)
+    for relation in relations:
+        targets[relation.user_id].append(
+            relation.follower_id if model is Follow else relation.recipe_id
+        )
+    return targets
+
+
+def record_ranking_events(model, relations, delta):
+    if model in RANKING_KINDS:
+        RecipeRankingEvent.objects.record(RANKING_KINDS[model], delta, [
+            (relation.recipe_id, relation.created_at)
+            for relation in relations
+        ])
+
+
+def relations_added(model, relations):
+    for user_id, target_ids in get_targets(model, relations).items():
+        if model is Follow:
+            change_counters(User, target_ids, 'followers_count', 1)
+            FeedEntry.objects.follow(user_id, target_ids)
+            continue
+        change_counters(Recipe, target_ids, COUNTERS[model], 1)
+        if model is ShoppingCart:
+            ShoppingListItem.objects.apply_recipes(
+                user_id, added_ids=target_ids
+            )
+    record_ranking_events(model, relations, 1)
+
+
+def relations_removed(model, relations):
+    for user_id, target_ids in get_targets(model, relations).items():
+        if model is Follow:
+            change_counters(User, target_ids, 'followers_count', -1)
+            FeedEntry.objects.unfollow(user_id, target_ids)
+            continue
+        change_counters(Recipe, target_ids, COUNTERS[model], -1)
+        if model is ShoppingCart:
+            ShoppingListItem.objects.apply_recipes(
+                user_id, removed_ids=target_ids
+            )
+    record_ranking_events(model, relations, -1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def add_relation(sender, instance, created, **kwargs):
+    if created:
+        relations_added(sender, [instance])
+
+
+@receiver(pre_delete, sender=Favorite)
+@receiver(pre_delete, sender=ShoppingCart)
+@receiver(pre_delete, sender=Follow)
+def remove_relation(sender, instance, **kwargs):
+    relations_removed(sender, [instance])
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=UsedIngredients)
+@receiver(post_delete, sender=UsedIngredients)
+def touch_recipe(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(recipeName__ingredient=instance).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_shopping_lists(sender, instance, created, **kwargs):
+    if not created:
+        ShoppingListItem.objects.touch_ingredient(instance.id)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def touch_deleted_ingredient_shopping_lists(sender, instance, **kwargs):
+    ShoppingListItem.objects.touch_ingredient(instance.id)
+
+
+def refresh_search_documents(recipe_ids):
+    transaction.on_commit(
+        partial(RecipeSearchDocument.objects.refresh, recipe_ids)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search_document(sender, instance, **kwargs):
+    refresh_search_documents([instance.id])
+
+
+@receiver(post_save, sender=UsedIngredients)
+@receiver(post_delete, sender=UsedIngredients)
+def refresh_ingredients_search_document(sender, instance, **kwargs):
+    refresh_search_documents([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(list(
+            UsedIngredients.objects.filter(ingredient=instance)
+            .values_list('recipe_id', flat=True)
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            partial(FeedEntry.objects.fan_out, [instance.id])
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_ranking(sender, instance, created, **kwargs):
+    if created:
+        RecipeRanking.objects.create(recipe=instance)
@@ -0,0 +1,91 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from recipes.models import (Recipe, RecipeRanking, RecipeRankingEvent,
+                            add_decayed)
+from users.models import User
+
+
+class AddDecayedTests(SimpleTestCase):
+
+    def test_empty_terms_keep_the_score(self):
+        self.assertEqual(add_decayed(0, []), 0)
+        self.assertEqual(add_decayed(7.5, []), 7.5)
+
+    def test_single_term_is_its_exponent(self):
+        self.assertAlmostEqual(add_decayed(0, [(1.0, 10)]), 10)
+        self.assertAlmostEqual(add_decayed(0, [(0.5, 10)]), 9)
+
+    def test_older_terms_weigh_half_per_half_life(self):
+        self.assertAlmostEqual(add_decayed(0, [(1.0, 10), (1.0, 10)]), 11)
+        self.assertAlmostEqual(add_decayed(0, [(1.0, 10), (1.0, 9)]),
+                               10 + math.log2(1.5))
+        self.assertAlmostEqual(add_decayed(10, [(1.0, 8)]),
+                               10 + math.log2(1.25))
+
+    def test_increments_match_a_single_sum(self):
+        terms = [(1.0, 3.25), (0.5, 4.5), (1.0, 6), (0.5, 5.75)]
+        score = 0
+        for term in terms:
+            score = add_decayed(score, [term])
+        self.assertAlmostEqual(score, add_decayed(0, terms))
+
+    def test_removal_cancels_the_addition(self):
+        score = add_decayed(0, [(1.0, 10), (0.5, 12)])
+        self.assertAlmostEqual(add_decayed(score, [(-0.5, 12)]), 10)
+        self.assertEqual(add_decayed(score, [(-1.0, 10), (-0.5, 12)]), 0.0)
+
+    def test_large_exponents_do_not_overflow(self):
+        self.assertAlmostEqual(
+            add_decayed(0, [(1.0, 20000), (1.0, 20000)]), 20001
+        )
+        self.assertAlmostEqual(add_decayed(20000, [(1.0, 10)]), 20000)
+
+
+@override_settings(RECIPE_RANKING_WEIGHTS={'favorite': 1.0, 'cart': 0.5},
+                   RECIPE_TRENDING_HALF_LIFE=3600)
+class RecipeRankingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Пирог', text='Описание',
+            image='recipes/test.png', cooking_time=30,
+        )
+        cls.started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def record(self, kind, delta, hours):
+        RecipeRankingEvent.objects.record(kind, delta, [
+            (self.recipe.id, self.started + timedelta(hours=hours))
+        ])
+
+    def get_ranking(self):
+        return RecipeRanking.objects.get(recipe=self.recipe)
+
+    def test_refresh_applies_weights_and_decay(self):
+        self.record(RecipeRankingEvent.FAVORITE, 1, 0)
+        self.record(RecipeRankingEvent.CART, 1, 1)
+        RecipeRanking.objects.refresh()
+        ranking = self.get_ranking()
+        exponent = self.started.timestamp() / 3600
+        self.assertAlmostEqual(ranking.popular_score, 1.5)
+        self.assertAlmostEqual(ranking.trending_score, add_decayed(
+            0, [(1.0, exponent), (0.5, exponent + 1)]
+        ))
+        self.assertAlmostEqual(ranking.trending_score, exponent + 1)
+        self.assertFalse(RecipeRankingEvent.objects.exists())
+
+    def test_refresh_in_batches_matches_one_pass(self):
+        for hours in range(5):
+            self.record(RecipeRankingEvent.FAVORITE, 1, hours)
+        self.record(RecipeRankingEvent.FAVORITE, -1, 2)
+        RecipeRanking.objects.refresh(batch_size=2)
+        exponent = self.started.timestamp() / 3600
+        self.assertAlmostEqual(self.get_ranking().trending_score, add_decayed(
+            0, [(1.0, exponent + hours) for hours in (0, 1, 3, 4)]
+        ))
@@ -4,7 +4,21 @@ from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True, max_length=254,
                               verbose_name='Адрес эл. почты')
     username = models.CharField(max_length=150, unique=True,
@@ -20,8 +34,22 @@ class User(AbstractUser):
         upload_to='users/', null=True, blank=True,
         verbose_name='Аватар пользователя'
     )
+    avatar_renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Превью аватара'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество рецептов')
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество подписчиков')
+    shopping_list_version = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Версия списка покупок')
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='Дата изменения')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    counter_fields = ('recipes_count', 'followers_count',
+                      'shopping_list_version')
 
     class Meta:
         verbose_name = 'Пользователь'